@@ -0,0 +1,270 @@
+import argparse
+import asyncio
+import json
+import logging
+import ssl
+import time
+import uuid
+
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+
+import lpmegabot
+import settings
+
+from outbox import PRUNE_THRESHOLD, TokenBucket, coalesce
+
+INLINE_COMMANDS = {'start', 'wordcount'}
+MAX_BACKOFF = 30
+
+
+class TelegramAPIError(Exception):
+    pass
+
+
+class TelegramClient:
+    def __init__(self, token, pool_size=8, base_url='https://api.telegram.org', timeout=10):
+        url = urlsplit(base_url)
+        self.host = url.hostname
+        self.port = url.port or (443 if url.scheme == 'https' else 80)
+        self.ssl = ssl.create_default_context() if url.scheme == 'https' else None
+        self.prefix = f"{url.path.rstrip('/')}/bot{token}"
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._idle = []
+        self._slots = None
+
+    async def _connect(self, reuse=True):
+        while reuse and self._idle:
+            reader, writer = self._idle.pop()
+            if not reader.at_eof():
+                return reader, writer
+            writer.close()
+        return await asyncio.wait_for(asyncio.open_connection(self.host, self.port, ssl=self.ssl), self.timeout)
+
+    @staticmethod
+    async def _read_response(reader):
+        if not await reader.readline():
+            raise asyncio.IncompleteReadError(b'', None)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            body = bytearray()
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if not size:
+                    await reader.readline()
+                    break
+                body += await reader.readexactly(size)
+                await reader.readline()
+        else:
+            body = await reader.readexactly(int(headers.get('content-length', 0)))
+        return headers, bytes(body)
+
+    async def call(self, method, **params):
+        return await self._request(method, json.dumps(params).encode(), 'application/json',
+                                   self.timeout + params.get('timeout', 0))
+
+    async def upload(self, method, field, filename, data, **params):
+        boundary = uuid.uuid4().hex
+        parts = [f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+                 for name, value in params.items()]
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+                     f'Content-Type: application/octet-stream\r\n\r\n'.encode() + data + b'\r\n')
+        parts.append(f'--{boundary}--\r\n'.encode())
+        return await self._request(method, b''.join(parts), f'multipart/form-data; boundary={boundary}', self.timeout)
+
+    async def _request(self, method, body, content_type, timeout):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.pool_size)
+        request = (f"POST {self.prefix}/{method} HTTP/1.1\r\n"
+                   f"Host: {self.host}\r\n"
+                   f"Content-Type: {content_type}\r\n"
+                   f"Content-Length: {len(body)}\r\n"
+                   f"Connection: keep-alive\r\n\r\n").encode() + body
+        async with self._slots:
+            for attempt in range(2):
+                reader, writer = await self._connect(reuse=not attempt)
+                try:
+                    writer.write(request)
+                    await writer.drain()
+                    headers, payload = await asyncio.wait_for(self._read_response(reader), timeout)
+                    break
+                except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError):
+                    writer.close()
+                    if attempt:
+                        raise
+            if headers.get('connection', '').lower() == 'close':
+                writer.close()
+            else:
+                self._idle.append((reader, writer))
+        result = json.loads(payload)
+        if not result.get('ok'):
+            raise TelegramAPIError(result.get('description'))
+        return result['result']
+
+    async def close(self):
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+
+class Message:
+    def __init__(self, data):
+        self.text = data.get('text', '')
+        self.chat_id = data['chat']['id']
+        self.replies = []
+        self.documents = []
+
+    def reply_text(self, text, **kwargs):
+        self.replies.append(str(text))
+
+    def reply_document(self, document, filename=None, **kwargs):
+        self.documents.append((filename or 'document', document.read()))
+
+
+class AsyncBot:
+    def __init__(self, api, workers=8, global_rate=30, chat_rate=1, chat_burst=3):
+        self.api = api
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="async-bot")
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self._buckets = {}
+        self._prune_at = PRUNE_THRESHOLD
+        self.commands = {}
+        self.text_handler = None
+        self.user_data = defaultdict(dict)
+        self.chat_data = defaultdict(dict)
+        self._chat_locks = {}
+        self._tasks = set()
+
+    def command(self, name, callback, offload=True):
+        self.commands[name] = (callback, offload)
+
+    def text(self, callback, offload=False):
+        self.text_handler = (callback, offload)
+
+    def _prune_buckets(self):
+        now = time.monotonic()
+        self._buckets = {chat_id: bucket for chat_id, bucket in self._buckets.items()
+                         if chat_id in self._chat_locks or not bucket.full(now)}
+        self._prune_at = max(PRUNE_THRESHOLD, 2 * len(self._buckets))
+
+    async def _throttle(self, chat_id):
+        if len(self._buckets) >= self._prune_at:
+            self._prune_buckets()
+        bucket = self._buckets.setdefault(chat_id, TokenBucket(self.chat_rate, self.chat_burst))
+        while True:
+            delay = max(bucket.delay(), self.global_bucket.delay())
+            if not delay:
+                break
+            await asyncio.sleep(delay)
+        bucket.take()
+        self.global_bucket.take()
+
+    def _route(self, text):
+        if text.startswith('/'):
+            command, *args = text.split()
+            handler = self.commands.get(command[1:].split('@')[0].lower())
+            if handler is not None:
+                return handler, args
+        return self.text_handler, text.split()
+
+    async def handle(self, data):
+        message_data = data.get('message')
+        if not message_data or 'text' not in message_data:
+            return
+        handler, args = self._route(message_data['text'])
+        if handler is None:
+            return
+        callback, offload = handler
+        message = Message(message_data)
+        sender = message_data.get('from', {})
+        user_id = sender.get('id', message.chat_id)
+        update = SimpleNamespace(message=message,
+                                 effective_chat=SimpleNamespace(id=message.chat_id),
+                                 effective_user=SimpleNamespace(id=user_id, first_name=sender.get('first_name')))
+        context = SimpleNamespace(args=args, user_data=self.user_data[user_id],
+                                  chat_data=self.chat_data[message.chat_id], bot=self.api)
+        entry = self._chat_locks.setdefault(message.chat_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                await self._run(callback, offload, update, context, message)
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._chat_locks[message.chat_id]
+
+    async def _run(self, callback, offload, update, context, message):
+        try:
+            if offload:
+                await asyncio.get_running_loop().run_in_executor(self.executor, callback, update, context)
+            else:
+                callback(update, context)
+        except Exception:
+            logging.exception("Handler for %r failed", message.text)
+        for text in coalesce(message.replies):
+            await self._throttle(message.chat_id)
+            await self.api.call('sendMessage', chat_id=message.chat_id, text=text)
+        for filename, data in message.documents:
+            await self._throttle(message.chat_id)
+            await self.api.upload('sendDocument', 'document', filename, data, chat_id=message.chat_id)
+
+    async def _handle_safely(self, data):
+        try:
+            await self.handle(data)
+        except Exception:
+            logging.exception("Failed to answer update %s", data.get('update_id'))
+
+    async def poll(self, timeout=30):
+        offset = None
+        backoff = 1
+        while True:
+            try:
+                updates = await self.api.call('getUpdates', offset=offset, timeout=timeout)
+            except (OSError, EOFError, ValueError, asyncio.TimeoutError, TelegramAPIError) as e:
+                logging.warning("getUpdates failed (%r), retrying in %d s", e, backoff)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF)
+                continue
+            backoff = 1
+            for data in updates:
+                offset = data['update_id'] + 1
+                task = asyncio.ensure_future(self._handle_safely(data))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+
+def setup_async_bot(bot):
+    lpmegabot.open_resources()
+    for command, callback in lpmegabot.COMMANDS.items():
+        bot.command(command, lpmegabot.instrument(command, callback), offload=command not in INLINE_COMMANDS)
+    bot.text(lpmegabot.METRICS.wrap("text", lpmegabot.talk_to_me))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the bot on the asyncio handler layer.")
+    parser.add_argument('--pool-size', type=int, default=8, help="keep-alive connections to the Bot API")
+    parser.add_argument('--workers', type=int, default=8, help="threads for blocking handlers")
+    args = parser.parse_args()
+
+    lpmegabot.setup_logging()
+    bot = AsyncBot(TelegramClient(settings.API_KEY, args.pool_size), args.workers)
+    setup_async_bot(bot)
+    try:
+        asyncio.run(bot.poll())
+    finally:
+        lpmegabot.close_resources()
+
+
+if __name__ == '__main__':
+    main()
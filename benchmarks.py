@@ -0,0 +1,116 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import timeit
+
+import settings
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks.json')
+NOISE_FACTOR = 3
+TEXT = ("Привет, мир! Hello, world... Это тест — test-driven, 42 раза; e-mail: don't stop 🙂 "
+        "Съешь же ещё этих мягких французских булок, да выпей чаю. ")
+
+
+def cases(lpmegabot):
+    calc_engine = lpmegabot.calc_engine
+    cities = lpmegabot.cities
+    compile_lexemes = calc_engine._compile.__wrapped__
+
+    def parse(expr, mode):
+        return compile_lexemes(calc_engine.lex.__wrapped__(expr), mode)
+
+    index = cities.get_index(lpmegabot.CITIES_DATASET)
+    game = lpmegabot.CitiesGame(cities.GameState(index))
+    long_sum = '+'.join(['1'] * 400)
+    long_sum_code = parse(long_sum, 'float')
+    nested = '(' * 45 + '1+2' + ')' * 45
+    long_text = TEXT * 100
+
+    def logic(user_city, bot_city_prev):
+        return lambda: lpmegabot.CitiesGame(cities.GameState(index), lpmegabot.CITIES_SAMPLES).logic(
+            user_city, bot_city_prev)
+
+    return {
+        'prettify_name/word': lambda: lpmegabot.prettify_name('москва'),
+        'prettify_name/hyphen': lambda: lpmegabot.prettify_name('ростов-на-дону'),
+        'prettify_name/spaces': lambda: lpmegabot.prettify_name('нижний новгород'),
+        'prettify_name/long_hyphen': lambda: lpmegabot.prettify_name('-'.join(['абв'] * 500)),
+        'count_words/sentence': lambda: lpmegabot.text_tokenizer.count_words(TEXT),
+        'count_words/long_text': lambda: lpmegabot.text_tokenizer.count_words(long_text),
+        'count_words/punctuation': lambda: lpmegabot.text_tokenizer.count_words('!?.,;' * 2000),
+        'count_words/hyphens': lambda: lpmegabot.text_tokenizer.count_words('a-' * 5000, hyphenated=True),
+        'calc/parse_simple': lambda: parse('2+2*2', 'float'),
+        'calc/parse_long_sum': lambda: parse(long_sum, 'float'),
+        'calc/parse_nested': lambda: parse(nested, 'float'),
+        'calc/evaluate_long_sum': lambda: calc_engine.evaluate(long_sum_code),
+        'calc/calculate_cached': lambda: calc_engine.calculate('2^10 - 3*(4+5)/6'),
+        'calc/calculate_exact': lambda: calc_engine.calculate('1/3 + 1/6 - 2^20', 'exact'),
+        'cities/get_letter': lambda: game._get_letter('москва', game.last),
+        'cities/get_letter_soft_signs': lambda: game._get_letter('казань' + 'ь' * 200, game.last),
+        'cities/logic_first_move': logic('москва', None),
+        'cities/logic_reply': logic('анапа', 'москва'),
+        'cities/logic_wrong_letter': logic('тула', 'москва'),
+        'cities/logic_unknown_city': logic('абракадабра', None),
+    }
+
+
+def measure(fn, repeat=7):
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    runs = [elapsed / number * 1e6 for elapsed in timer.repeat(repeat, number)]
+    return {'min': round(min(runs), 3), 'stdev': round(statistics.stdev(runs), 3)}
+
+
+def limit(baseline, result, threshold):
+    return baseline['min'] * (1 + threshold) + NOISE_FACTOR * max(baseline['stdev'], result['stdev'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the hot pure functions and compare them with a baseline.")
+    parser.add_argument('--save', action='store_true', help="write the results as the new baseline")
+    parser.add_argument('--compare', action='store_true', help="fail if a function is slower than the baseline")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="allowed slowdown on top of the measured noise, 0.25 means 25%%")
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('-k', dest='pattern', default='', help="only run benchmarks containing this text")
+    args = parser.parse_args()
+
+    settings.GAME_STORE = 'memory://'
+    settings.CHAT_STATS_PATH = ':memory:'
+    import lpmegabot
+
+    baseline = {}
+    if args.compare or args.save and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = {}
+    regressions = []
+    try:
+        for name, fn in cases(lpmegabot).items():
+            if args.pattern not in name:
+                continue
+            result = results[name] = measure(fn)
+            line = f"{name:<32}{result['min']:>12.3f} us ±{result['stdev']:<8.3f}"
+            if args.compare and name in baseline:
+                line += f"{baseline[name]['min']:>12.3f} us{result['min'] / baseline[name]['min']:>8.2f}x"
+                if result['min'] > limit(baseline[name], result, args.threshold):
+                    regressions.append(name)
+                    line += "  SLOWER"
+            print(line)
+    finally:
+        lpmegabot.close_resources()
+
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump(dict(baseline, **results), f, indent=2, sort_keys=True)
+            f.write('\n')
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%} plus noise: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
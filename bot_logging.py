@@ -0,0 +1,112 @@
+import atexit
+import copy
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import time
+
+from functools import wraps
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+CONTEXT_FIELDS = ('chat_id', 'command', 'latency')
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        data = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            if hasattr(record, field):
+                data[field] = getattr(record, field)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exception'] = record.exc_text
+        return json.dumps(data, ensure_ascii=False)
+
+
+class RecordQueueHandler(QueueHandler):
+    def __init__(self, records, keep_exc_info=True):
+        super().__init__(records)
+        self.keep_exc_info = keep_exc_info
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            if not self.keep_exc_info:
+                record.exc_info = None
+        return record
+
+
+def gzip_namer(name):
+    return f"{name}.gz"
+
+
+def gzip_rotator(source, dest):
+    with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+def file_handler(filename, max_bytes, backups, when=None):
+    if when:
+        handler = TimedRotatingFileHandler(filename, when=when, backupCount=backups, encoding='utf-8')
+    else:
+        handler = RotatingFileHandler(filename, maxBytes=max_bytes, backupCount=backups, encoding='utf-8')
+    handler.namer = gzip_namer
+    handler.rotator = gzip_rotator
+    return handler
+
+
+def setup_logging(filename="bot.log", json_format=False, max_bytes=10 << 20, backups=5, when=None,
+                  level=logging.INFO):
+    handler = file_handler(filename, max_bytes, backups, when)
+    handler.setFormatter(JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT))
+    records = queue.SimpleQueue()
+    listener = QueueListener(records, handler, respect_handler_level=True)
+    root = logging.getLogger()
+    root.addHandler(RecordQueueHandler(records))
+    root.setLevel(level)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+def listen_to_processes(records, listener):
+    processes = QueueListener(records, *listener.handlers, respect_handler_level=True)
+    processes.start()
+    atexit.register(processes.stop)
+    return processes
+
+
+def log_to_parent(records, level=logging.INFO):
+    root = logging.getLogger()
+    root.addHandler(RecordQueueHandler(records, keep_exc_info=False))
+    root.setLevel(level)
+
+
+def logged(command, callback):
+    @wraps(callback)
+    def wrapper(update, context):
+        start = time.perf_counter()
+        try:
+            return callback(update, context)
+        finally:
+            chat = getattr(update, 'effective_chat', None)
+            latency = round(time.perf_counter() - start, 6)
+            logging.info("/%s handled in %.1f ms", command, latency * 1000,
+                         extra={'chat_id': chat.id if chat else None, 'command': command, 'latency': latency})
+    return wrapper
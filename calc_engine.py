@@ -0,0 +1,353 @@
+import decimal
+import math
+import multiprocessing
+import operator
+import queue
+import re
+import threading
+
+from decimal import Decimal
+from fractions import Fraction
+from functools import lru_cache
+
+TOKEN = re.compile(r'\s*(?:(\d+\.?\d*(?:[eE][-+]?\d+)?|\.\d+(?:[eE][-+]?\d+)?)|(\*\*|[-+*/^()])|([^\W\d]\w*))')
+ASSIGNMENT = re.compile(r'\s*([^\W\d]\w*)\s*=(.*)')
+BINARY = {'+': (1, 'left'), '-': (1, 'left'), '*': (2, 'left'), '/': (2, 'left'), '^': (4, 'right')}
+UNARY_PRIORITY = 3
+NEGATE = 'neg'
+MAX_LENGTH = 1000
+MAX_DEPTH = 50
+MAX_DIGITS = 1000
+MAX_BITS = math.ceil(MAX_DIGITS * math.log2(10))
+MAX_PRECISION = 1000
+MODES = ('float', 'exact', 'decimal')
+MAX_BATCH_LINES = 10000
+BATCH_LINE_BUDGET = 0.005
+MAX_BATCH_TIMEOUT = 10.0
+
+
+class CalcError(ValueError):
+    pass
+
+
+class CalcTimeout(CalcError):
+    pass
+
+
+def exact_size(value):
+    parts = (value.numerator, value.denominator) if isinstance(value, Fraction) else (value,)
+    if any(part.bit_length() > MAX_BITS for part in parts):
+        raise CalcError("The result is too large.")
+    return value
+
+
+def exact_literal(text):
+    exponent = text.lower().partition('e')[2]
+    if exponent and abs(int(exponent)) > MAX_DIGITS:
+        raise CalcError("The number is too large.")
+    return exact_size(int(text) if text.isdigit() else Fraction(text))
+
+
+LITERALS = {'float': float, 'exact': exact_literal, 'decimal': Decimal}
+
+
+@lru_cache(maxsize=1024)
+def lex(expr):
+    lexemes = []
+    pos = 0
+    expr = expr.rstrip()
+    while pos < len(expr):
+        match = TOKEN.match(expr, pos)
+        if match is None:
+            raise CalcError(f"Unexpected symbol '{expr[pos:].lstrip()[0]}'.")
+        lexemes.append(match.groups())
+        pos = match.end()
+    return tuple(lexemes)
+
+
+def _tokens(lexemes, mode):
+    literal = LITERALS[mode]
+    tokens = []
+    for number, op, name in lexemes:
+        if number is not None:
+            tokens.append(('num', literal(number)))
+        elif name is not None:
+            tokens.append(('name', name))
+        else:
+            tokens.append(('op', '^' if op == '**' else op))
+    return tokens
+
+
+def tokenize(expr, mode='float'):
+    return _tokens(lex(expr), mode)
+
+
+class Parser:
+    def __init__(self, tokens, texts=None):
+        self.tokens = tokens
+        self.texts = texts or [str(value) for _, value in tokens]
+        self.pos = 0
+        self.depth = 0
+        self.code = []
+
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def parse(self):
+        if not self.tokens:
+            raise CalcError("Empty expression.")
+        self._expression(0)
+        if self.pos != len(self.tokens):
+            raise CalcError(f"Unexpected '{self.texts[self.pos]}'.")
+        return tuple(self.code)
+
+    def _expression(self, min_priority):
+        self.depth += 1
+        if self.depth > MAX_DEPTH:
+            raise CalcError("The expression is nested too deeply.")
+        self._unary()
+        while True:
+            kind, value = self._peek()
+            if kind != 'op' or value not in BINARY or BINARY[value][0] < min_priority:
+                break
+            priority, assoc = BINARY[value]
+            self.pos += 1
+            self._expression(priority + 1 if assoc == 'left' else priority)
+            self.code.append(value)
+        self.depth -= 1
+
+    def _unary(self):
+        kind, value = self._peek()
+        if kind == 'op' and value in '+-':
+            self.pos += 1
+            self._expression(UNARY_PRIORITY)
+            if value == '-':
+                self.code.append(NEGATE)
+        else:
+            self._primary()
+
+    def _primary(self):
+        kind, value = self._peek()
+        self.pos += 1
+        if kind == 'num':
+            self.code.append(value)
+        elif kind == 'name':
+            self.code.append((value,))
+        elif value == '(':
+            self._expression(0)
+            if self._peek() != ('op', ')'):
+                raise CalcError("Missing ')'.")
+            self.pos += 1
+        else:
+            raise CalcError("Missing operand." if kind is None else f"Unexpected '{self.texts[self.pos - 1]}'.")
+
+
+@lru_cache(maxsize=1024)
+def _compile(lexemes, mode):
+    return Parser(_tokens(lexemes, mode), [next(filter(None, lexeme)) for lexeme in lexemes]).parse()
+
+
+def compile_expr(expr, mode='float'):
+    if len(expr) > MAX_LENGTH:
+        raise CalcError(f"The expression is longer than {MAX_LENGTH} characters.")
+    return _compile(lex(expr), mode)
+
+
+def log10_abs(value):
+    if isinstance(value, Fraction):
+        return math.log10(abs(value.numerator)) - math.log10(value.denominator)
+    if isinstance(value, Decimal):
+        return float(abs(value).log10())
+    return math.log10(abs(value))
+
+
+def power(base, exponent):
+    if base and exponent and float(exponent) * log10_abs(base) > MAX_DIGITS:
+        raise CalcError("The result is too large.")
+    result = operator.pow(base, exponent)
+    if isinstance(result, complex):
+        raise CalcError("The result is not a real number.")
+    return result
+
+
+def exact_division(dividend, divisor):
+    return Fraction(dividend) / divisor
+
+
+def exact_power(base, exponent):
+    if not isinstance(exponent, int) and exponent.denominator != 1:
+        raise CalcError("Only integer powers are exact. Use /calc_mode float or decimal.")
+    base, exponent = Fraction(base), int(exponent)
+    if any(part and abs(exponent) * math.log10(abs(part)) > MAX_DIGITS
+           for part in (base.numerator, base.denominator)):
+        raise CalcError("The result is too large.")
+    result = exact_size(power(base, exponent))
+    return result.numerator if result.denominator == 1 else result
+
+
+OPERATIONS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.truediv,
+    '^': power,
+}
+
+
+def exact_operation(operation):
+    return lambda left, right: exact_size(operation(left, right))
+
+
+EXACT_OPERATIONS = {
+    '+': exact_operation(operator.add),
+    '-': exact_operation(operator.sub),
+    '*': exact_operation(operator.mul),
+    '/': exact_operation(exact_division),
+    '^': exact_power,
+}
+
+
+def evaluate(code, operations=OPERATIONS, variables=None):
+    stack = []
+    for op in code:
+        if op.__class__ is tuple:
+            if variables is None or op[0] not in variables:
+                raise CalcError(f"Unknown variable '{op[0]}'.")
+            stack.append(variables[op[0]])
+        elif op.__class__ is not str:
+            stack.append(op)
+        elif op == NEGATE:
+            stack[-1] = -stack[-1]
+        else:
+            right = stack.pop()
+            stack[-1] = operations[op](stack[-1], right)
+    if isinstance(stack[0], complex):
+        raise CalcError("The result is not a real number.")
+    return stack[0]
+
+
+def calculate(expr, mode='float', precision=28, variables=None):
+    code = compile_expr(expr, mode)
+    if mode == 'exact':
+        result = evaluate(code, EXACT_OPERATIONS, variables)
+        return result.numerator if isinstance(result, Fraction) and result.denominator == 1 else result
+    if mode == 'decimal':
+        with decimal.localcontext() as context:
+            context.prec = min(precision, MAX_PRECISION)
+            return +evaluate(code, OPERATIONS, variables)
+    return evaluate(code, OPERATIONS, variables)
+
+
+def format_result(value):
+    if isinstance(value, Fraction):
+        return f"{value} ≈ {float(value):.15g}"
+    if isinstance(value, Decimal):
+        return format(value.to_integral_value(), 'f') if value == value.to_integral_value() else str(value)
+    return str(value)
+
+
+def error_message(error):
+    if isinstance(error, ZeroDivisionError):
+        return "You can't divide by zero."
+    if isinstance(error, (OverflowError, decimal.Overflow)):
+        return "The result is too large."
+    if isinstance(error, CalcError):
+        return str(error)
+    return "The result is not a number."
+
+
+def run_batch(lines, mode='float', precision=28):
+    variables = {}
+    results = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        match = ASSIGNMENT.fullmatch(line)
+        name, expr = match.groups() if match else (None, line)
+        try:
+            value = calculate(expr, mode, precision, variables)
+            text = format_result(value)
+        except (ArithmeticError, TypeError, ValueError) as e:
+            results.append(f"{line}: {error_message(e)}")
+            continue
+        if name is None:
+            results.append(f"{line} = {text}")
+        else:
+            variables[name] = value
+            results.append(f"{name} = {text}")
+    return results
+
+
+TASKS = {'calculate': calculate, 'run_batch': run_batch}
+
+
+def _serve(conn):
+    conn.send((True, None))
+    while True:
+        task, args = conn.recv()
+        try:
+            conn.send((True, TASKS[task](*args)))
+        except (ArithmeticError, CalcError) as e:
+            conn.send((False, e))
+        except Exception as e:
+            conn.send((False, CalcError(error_message(e))))
+
+
+class CalcPool:
+    def __init__(self, workers=2, timeout=1.0, batch_timeout=MAX_BATCH_TIMEOUT):
+        self.timeout = timeout
+        self.batch_timeout = batch_timeout
+        self._context = multiprocessing.get_context('spawn')
+        self._slots = threading.BoundedSemaphore(workers)
+        self._idle = queue.LifoQueue()
+
+    def _spawn(self):
+        conn, child_conn = self._context.Pipe()
+        process = self._context.Process(target=_serve, args=(child_conn,), name="calc-worker", daemon=True)
+        process.start()
+        conn.recv()
+        return process, conn
+
+    def calculate(self, expr, mode='float', precision=28):
+        compile_expr(expr, mode)
+        return self._run('calculate', (expr, mode, precision), self.timeout)
+
+    def run_batch(self, lines, mode='float', precision=28):
+        if len(lines) > MAX_BATCH_LINES:
+            raise CalcError(f"Send at most {MAX_BATCH_LINES} lines at once.")
+        timeout = min(self.timeout + len(lines) * BATCH_LINE_BUDGET, self.batch_timeout)
+        return self._run('run_batch', (lines, mode, precision), timeout)
+
+    def _run(self, task, args, timeout):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise CalcTimeout("The calculator is busy. Try again later.")
+        try:
+            try:
+                process, conn = self._idle.get_nowait()
+            except queue.Empty:
+                process, conn = self._spawn()
+            try:
+                conn.send((task, args))
+                if not conn.poll(timeout):
+                    raise CalcTimeout("The calculation takes too long.")
+                ok, result = conn.recv()
+            except CalcTimeout:
+                process.kill()
+                process.join()
+                raise
+            except (EOFError, OSError):
+                process.kill()
+                process.join()
+                raise CalcError("The calculator stopped unexpectedly. Try again.")
+            self._idle.put((process, conn))
+        finally:
+            self._slots.release()
+        if not ok:
+            raise result
+        return result
+
+    def close(self):
+        while not self._idle.empty():
+            process, _ = self._idle.get_nowait()
+            process.kill()
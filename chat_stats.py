@@ -0,0 +1,89 @@
+import heapq
+import logging
+import sqlite3
+import threading
+
+
+class ChatStats:
+    def __init__(self, path, flush_interval=None):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS chat_stats_chats ("
+                               "chat_id INTEGER PRIMARY KEY, enabled INTEGER NOT NULL)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS chat_stats_users ("
+                               "chat_id INTEGER NOT NULL, user_id INTEGER NOT NULL, name TEXT, "
+                               "words INTEGER NOT NULL, messages INTEGER NOT NULL, "
+                               "PRIMARY KEY (chat_id, user_id))")
+        self._chats = {}
+        self._dirty = {}
+        self._stopped = threading.Event()
+        self._flusher = None
+        if flush_interval:
+            self._flusher = threading.Thread(target=self._flush_every, args=(flush_interval,),
+                                             name="chat-stats", daemon=True)
+            self._flusher.start()
+
+    def _flush_every(self, interval):
+        while not self._stopped.wait(interval):
+            try:
+                self.flush()
+            except sqlite3.Error:
+                logging.exception("Failed to flush chat stats")
+
+    def _chat(self, chat_id):
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            row = self._conn.execute("SELECT enabled FROM chat_stats_chats WHERE chat_id = ?", (chat_id,)).fetchone()
+            users = self._conn.execute("SELECT user_id, name, words, messages FROM chat_stats_users "
+                                       "WHERE chat_id = ?", (chat_id,)).fetchall()
+            chat = self._chats[chat_id] = {
+                'enabled': bool(row and row[0]),
+                'users': {user_id: [name, words, messages] for user_id, name, words, messages in users},
+            }
+        return chat
+
+    def enable(self, chat_id, enabled=True):
+        with self._lock:
+            self._chat(chat_id)['enabled'] = enabled
+            self._dirty.setdefault(chat_id, set())
+
+    def is_enabled(self, chat_id):
+        with self._lock:
+            return self._chat(chat_id)['enabled']
+
+    def record(self, chat_id, user_id, name, words):
+        with self._lock:
+            chat = self._chat(chat_id)
+            if not chat['enabled']:
+                return
+            counters = chat['users'].setdefault(user_id, [name, 0, 0])
+            counters[0] = name
+            counters[1] += words
+            counters[2] += 1
+            self._dirty.setdefault(chat_id, set()).add(user_id)
+
+    def top(self, chat_id, k=10):
+        with self._lock:
+            users = self._chat(chat_id)['users'].values()
+            return [tuple(counters) for counters in heapq.nlargest(k, users, key=lambda counters: counters[1])]
+
+    def flush(self, context=None):
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+            with self._conn:
+                for chat_id, user_ids in dirty.items():
+                    chat = self._chats[chat_id]
+                    self._conn.execute("INSERT OR REPLACE INTO chat_stats_chats VALUES (?, ?)",
+                                       (chat_id, int(chat['enabled'])))
+                    self._conn.executemany("INSERT OR REPLACE INTO chat_stats_users VALUES (?, ?, ?, ?, ?)",
+                                           [(chat_id, user_id, *chat['users'][user_id]) for user_id in user_ids])
+
+    def close(self):
+        self._stopped.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+        with self._lock:
+            self._conn.close()
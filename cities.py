@@ -1,1077 +1,233 @@
-ru_cities = {'а': {'абаза',
-                   'абакан',
-                   'абдулино',
-                   'абинск',
-                   'агидель',
-                   'агрыз',
-                   'адыгейск',
-                   'азнакаево',
-                   'азов',
-                   'ак-довурак',
-                   'аксай',
-                   'алагир',
-                   'алапаевск',
-                   'алатырь',
-                   'алдан',
-                   'алейск',
-                   'александров',
-                   'александровск',
-                   'александровск-сахалинский',
-                   'алексеевка',
-                   'алексин',
-                   'алзамай',
-                   'альметьевск',
-                   'амурск',
-                   'анадырь',
-                   'анапа',
-                   'ангарск',
-                   'андреаполь',
-                   'анжеро-судженск',
-                   'анива',
-                   'апатиты',
-                   'апрелевка',
-                   'апшеронск',
-                   'арамиль',
-                   'аргун',
-                   'ардатов',
-                   'ардон',
-                   'арзамас',
-                   'аркадак',
-                   'армавир',
-                   'арсеньев',
-                   'арск',
-                   'артём',
-                   'артёмовск',
-                   'артёмовский',
-                   'архангельск',
-                   'асбест',
-                   'асино',
-                   'астрахань',
-                   'аткарск',
-                   'ахтубинск',
-                   'ачинск',
-                   'аша'},
-             'б': {'бабаево',
-                   'бабушкин',
-                   'бавлы',
-                   'багратионовск',
-                   'байкальск',
-                   'баймак',
-                   'бакал',
-                   'баксан',
-                   'балабаново',
-                   'балаково',
-                   'балахна',
-                   'балашиха',
-                   'балашов',
-                   'балей',
-                   'балтийск',
-                   'барабинск',
-                   'барнаул',
-                   'барыш',
-                   'батайск',
-                   'бежецк',
-                   'белая калитва',
-                   'белая холуница',
-                   'белгород',
-                   'белебей',
-                   'белинский',
-                   'белово',
-                   'белогорск',
-                   'белозерск',
-                   'белокуриха',
-                   'беломорск',
-                   'белорецк',
-                   'белореченск',
-                   'белоусово',
-                   'белоярский',
-                   'белый',
-                   'белёв',
-                   'бердск',
-                   'березники',
-                   'берёзовский',
-                   'беслан',
-                   'бийск',
-                   'бикин',
-                   'билибино',
-                   'биробиджан',
-                   'бирск',
-                   'бирюсинск',
-                   'бирюч',
-                   'благовещенск',
-                   'благодарный',
-                   'бобров',
-                   'богданович',
-                   'богородицк',
-                   'богородск',
-                   'боготол',
-                   'богучар',
-                   'бодайбо',
-                   'бокситогорск',
-                   'болгар',
-                   'бологое',
-                   'болотное',
-                   'болохово',
-                   'болхов',
-                   'большой камень',
-                   'бор',
-                   'борзя',
-                   'борисоглебск',
-                   'боровичи',
-                   'боровск',
-                   'бородино',
-                   'братск',
-                   'бронницы',
-                   'брянск',
-                   'бугульма',
-                   'бугуруслан',
-                   'будённовск',
-                   'бузулук',
-                   'буинск',
-                   'буй',
-                   'буйнакск',
-                   'бутурлиновка'},
-             'в': {'валдай',
-                   'валуйки',
-                   'велиж',
-                   'великие луки',
-                   'великий новгород',
-                   'великий устюг',
-                   'вельск',
-                   'венёв',
-                   'верещагино',
-                   'верея',
-                   'верхнеуральск',
-                   'верхний тагил',
-                   'верхний уфалей',
-                   'верхняя пышма',
-                   'верхняя салда',
-                   'верхняя тура',
-                   'верхотурье',
-                   'верхоянск',
-                   'весьегонск',
-                   'ветлуга',
-                   'видное',
-                   'вилюйск',
-                   'вилючинск',
-                   'вихоревка',
-                   'вичуга',
-                   'владивосток',
-                   'владикавказ',
-                   'владимир',
-                   'волгоград',
-                   'волгодонск',
-                   'волгореченск',
-                   'волжск',
-                   'волжский',
-                   'вологда',
-                   'володарск',
-                   'волоколамск',
-                   'волосово',
-                   'волхов',
-                   'волчанск',
-                   'вольск',
-                   'воркута',
-                   'воронеж',
-                   'ворсма',
-                   'воскресенск',
-                   'воткинск',
-                   'всеволожск',
-                   'вуктыл',
-                   'выборг',
-                   'выкса',
-                   'высоковск',
-                   'высоцк',
-                   'вытегра',
-                   'вышний волочёк',
-                   'вяземский',
-                   'вязники',
-                   'вязьма',
-                   'вятские поляны'},
-             'г': {'гаврилов посад',
-                   'гаврилов-ям',
-                   'гагарин',
-                   'гаджиево',
-                   'гай',
-                   'галич',
-                   'гатчина',
-                   'гвардейск',
-                   'гдов',
-                   'геленджик',
-                   'георгиевск',
-                   'глазов',
-                   'голицыно',
-                   'горбатов',
-                   'горно-алтайск',
-                   'горнозаводск',
-                   'горняк',
-                   'городец',
-                   'городище',
-                   'городовиковск',
-                   'гороховец',
-                   'горячий ключ',
-                   'грайворон',
-                   'гремячинск',
-                   'грозный',
-                   'грязи',
-                   'грязовец',
-                   'губаха',
-                   'губкин',
-                   'губкинский',
-                   'гудермес',
-                   'гуково',
-                   'гулькевичи',
-                   'гурьевск',
-                   'гусев',
-                   'гусиноозёрск',
-                   'гусь-хрустальный'},
-             'д': {'давлеканово',
-                   'дагестанские огни',
-                   'далматово',
-                   'дальнегорск',
-                   'дальнереченск',
-                   'данилов',
-                   'данков',
-                   'дегтярск',
-                   'дедовск',
-                   'демидов',
-                   'дербент',
-                   'десногорск',
-                   'дзержинск',
-                   'дзержинский',
-                   'дивногорск',
-                   'дигора',
-                   'димитровград',
-                   'дмитриев',
-                   'дмитров',
-                   'дмитровск',
-                   'дно',
-                   'добрянка',
-                   'долгопрудный',
-                   'долинск',
-                   'домодедово',
-                   'донецк',
-                   'донской',
-                   'дорогобуж',
-                   'дрезна',
-                   'дубна',
-                   'дубовка',
-                   'дудинка',
-                   'духовщина',
-                   'дюртюли',
-                   'дятьково'},
-             'е': {'егорьевск',
-                   'ейск',
-                   'екатеринбург',
-                   'елабуга',
-                   'елец',
-                   'елизово',
-                   'ельня',
-                   'еманжелинск',
-                   'емва',
-                   'енисейск',
-                   'ермолино',
-                   'ершов',
-                   'ессентуки',
-                   'ефремов'},
-             'ж': {'железноводск',
-                   'железногорск',
-                   'железногорск-илимский',
-                   'железнодорожный',
-                   'жердевка',
-                   'жигулёвск',
-                   'жиздра',
-                   'жирновск',
-                   'жуков',
-                   'жуковка',
-                   'жуковский'},
-             'з': {'завитинск',
-                   'заводоуковск',
-                   'заволжск',
-                   'заволжье',
-                   'задонск',
-                   'заинск',
-                   'закаменск',
-                   'заозёрный',
-                   'заозёрск',
-                   'западная двина',
-                   'заполярный',
-                   'зарайск',
-                   'заречный',
-                   'заринск',
-                   'звенигово',
-                   'звенигород',
-                   'зверево',
-                   'зеленогорск',
-                   'зеленоградск',
-                   'зеленодольск',
-                   'зеленокумск',
-                   'зерноград',
-                   'зея',
-                   'зима',
-                   'златоуст',
-                   'злынка',
-                   'змеиногорск',
-                   'знаменск',
-                   'зубцов',
-                   'зуевка'},
-             'и': {'ивангород',
-                   'иваново',
-                   'ивантеевка',
-                   'ивдель',
-                   'игарка',
-                   'ижевск',
-                   'избербаш',
-                   'изобильный',
-                   'иланский',
-                   'инза',
-                   'инсар',
-                   'инта',
-                   'ипатово',
-                   'ирбит',
-                   'иркутск',
-                   'исилькуль',
-                   'искитим',
-                   'истра',
-                   'ишим',
-                   'ишимбай'},
-             'к': {'кадников',
-                   'казань',
-                   'калач',
-                   'калач-на-дону',
-                   'калачинск',
-                   'калининград',
-                   'калининск',
-                   'калтан',
-                   'калуга',
-                   'калязин',
-                   'камбарка',
-                   'каменка',
-                   'каменногорск',
-                   'каменск-уральский',
-                   'каменск-шахтинский',
-                   'камень-на-оби',
-                   'камешково',
-                   'камызяк',
-                   'камышин',
-                   'камышлов',
-                   'канаш',
-                   'кандалакша',
-                   'канск',
-                   'карабаново',
-                   'карабаш',
-                   'карабулак',
-                   'карасук',
-                   'карачаевск',
-                   'карачев',
-                   'каргат',
-                   'каргополь',
-                   'карпинск',
-                   'карталы',
-                   'касимов',
-                   'касли',
-                   'каспийск',
-                   'катав-ивановск',
-                   'катайск',
-                   'качканар',
-                   'кашин',
-                   'кашира',
-                   'кедровый',
-                   'кемерово',
-                   'кемь',
-                   'кизел',
-                   'кизилюрт',
-                   'кизляр',
-                   'кимовск',
-                   'кимры',
-                   'кингисепп',
-                   'кинель',
-                   'кинешма',
-                   'киреевск',
-                   'киренск',
-                   'киржач',
-                   'кириллов',
-                   'кириши',
-                   'киров',
-                   'кировград',
-                   'кирово-чепецк',
-                   'кировск',
-                   'кирс',
-                   'кирсанов',
-                   'киселёвск',
-                   'кисловодск',
-                   'климовск',
-                   'клин',
-                   'клинцы',
-                   'княгинино',
-                   'ковдор',
-                   'ковров',
-                   'ковылкино',
-                   'когалым',
-                   'кодинск',
-                   'козельск',
-                   'козловка',
-                   'козьмодемьянск',
-                   'кола',
-                   'кологрив',
-                   'коломна',
-                   'колпашево',
-                   'колпино',
-                   'кольчугино',
-                   'коммунар',
-                   'комсомольск',
-                   'комсомольск-на-амуре',
-                   'конаково',
-                   'кондопога',
-                   'кондрово',
-                   'константиновск',
-                   'копейск',
-                   'кораблино',
-                   'кореновск',
-                   'коркино',
-                   'королёв',
-                   'короча',
-                   'корсаков',
-                   'коряжма',
-                   'костерёво',
-                   'костомукша',
-                   'кострома',
-                   'котельники',
-                   'котельниково',
-                   'котельнич',
-                   'котлас',
-                   'котово',
-                   'котовск',
-                   'кохма',
-                   'красавино',
-                   'красноармейск',
-                   'красновишерск',
-                   'красногорск',
-                   'краснодар',
-                   'красное село',
-                   'краснозаводск',
-                   'краснознаменск',
-                   'краснокаменск',
-                   'краснокамск',
-                   'краснослободск',
-                   'краснотурьинск',
-                   'красноуральск',
-                   'красноуфимск',
-                   'красноярск',
-                   'красный кут',
-                   'красный сулин',
-                   'красный холм',
-                   'кремёнки',
-                   'кронштадт',
-                   'кропоткин',
-                   'крымск',
-                   'кстово',
-                   'кубинка',
-                   'кувандык',
-                   'кувшиново',
-                   'кудымкар',
-                   'кузнецк',
-                   'куйбышев',
-                   'кулебаки',
-                   'кумертау',
-                   'кунгур',
-                   'купино',
-                   'курган',
-                   'курганинск',
-                   'курильск',
-                   'курлово',
-                   'куровское',
-                   'курск',
-                   'куртамыш',
-                   'курчатов',
-                   'куса',
-                   'кушва',
-                   'кызыл',
-                   'кыштым',
-                   'кяхта'},
-             'л': {'лабинск',
-                   'лабытнанги',
-                   'лагань',
-                   'ладушкин',
-                   'лаишево',
-                   'лакинск',
-                   'лангепас',
-                   'лахденпохья',
-                   'лебедянь',
-                   'лениногорск',
-                   'ленинск',
-                   'ленинск-кузнецкий',
-                   'ленск',
-                   'лермонтов',
-                   'лесной',
-                   'лесозаводск',
-                   'лесосибирск',
-                   'ливны',
-                   'ликино-дулёво',
-                   'липецк',
-                   'липки',
-                   'лиски',
-                   'лихославль',
-                   'лобня',
-                   'лодейное поле',
-                   'ломоносов',
-                   'лосино-петровский',
-                   'луга',
-                   'луза',
-                   'лукоянов',
-                   'луховицы',
-                   'лысково',
-                   'лысьва',
-                   'лыткарино',
-                   'льгов',
-                   'любань',
-                   'люберцы',
-                   'любим',
-                   'людиново',
-                   'лянтор'},
-             'м': {'магадан',
-                   'магас',
-                   'магнитогорск',
-                   'майкоп',
-                   'майский',
-                   'макаров',
-                   'макарьев',
-                   'макушино',
-                   'малая вишера',
-                   'малгобек',
-                   'малмыж',
-                   'малоархангельск',
-                   'малоярославец',
-                   'мамадыш',
-                   'мамоново',
-                   'мантурово',
-                   'мариинск',
-                   'мариинский посад',
-                   'маркс',
-                   'махачкала',
-                   'мглин',
-                   'мегион',
-                   'медвежьегорск',
-                   'медногорск',
-                   'медынь',
-                   'межгорье',
-                   'междуреченск',
-                   'мезень',
-                   'меленки',
-                   'мелеуз',
-                   'менделеевск',
-                   'мензелинск',
-                   'мещовск',
-                   'миасс',
-                   'микунь',
-                   'миллерово',
-                   'минеральные воды',
-                   'минусинск',
-                   'миньяр',
-                   'мирный',
-                   'михайлов',
-                   'михайловка',
-                   'михайловск',
-                   'мичуринск',
-                   'могоча',
-                   'можайск',
-                   'можга',
-                   'моздок',
-                   'мончегорск',
-                   'морозовск',
-                   'моршанск',
-                   'мосальск',
-                   'москва',
-                   'московский',
-                   'муравленко',
-                   'мураши',
-                   'мурманск',
-                   'муром',
-                   'мценск',
-                   'мыски',
-                   'мытищи',
-                   'мышкин'},
-             'н': {'набережные челны',
-                   'навашино',
-                   'наволоки',
-                   'надым',
-                   'назарово',
-                   'назрань',
-                   'называевск',
-                   'нальчик',
-                   'нариманов',
-                   'наро-фоминск',
-                   'нарткала',
-                   'нарьян-мар',
-                   'находка',
-                   'невель',
-                   'невельск',
-                   'невинномысск',
-                   'невьянск',
-                   'нелидово',
-                   'неман',
-                   'нерехта',
-                   'нерчинск',
-                   'нерюнгри',
-                   'нестеров',
-                   'нефтегорск',
-                   'нефтекамск',
-                   'нефтекумск',
-                   'нефтеюганск',
-                   'нея',
-                   'нижневартовск',
-                   'нижнекамск',
-                   'нижнеудинск',
-                   'нижние серги',
-                   'нижний ломов',
-                   'нижний новгород',
-                   'нижний тагил',
-                   'нижняя салда',
-                   'нижняя тура',
-                   'николаевск',
-                   'николаевск-на-амуре',
-                   'никольск',
-                   'никольское',
-                   'новая ладога',
-                   'новая ляля',
-                   'новоалександровск',
-                   'новоалтайск',
-                   'новоаннинский',
-                   'нововоронеж',
-                   'новодвинск',
-                   'новозыбков',
-                   'новокубанск',
-                   'новокузнецк',
-                   'новокуйбышевск',
-                   'новомичуринск',
-                   'новомосковск',
-                   'новопавловск',
-                   'новоржев',
-                   'новороссийск',
-                   'новосибирск',
-                   'новосиль',
-                   'новосокольники',
-                   'новотроицк',
-                   'новоузенск',
-                   'новоульяновск',
-                   'новоуральск',
-                   'новохопёрск',
-                   'новочебоксарск',
-                   'новочеркасск',
-                   'новошахтинск',
-                   'новый оскол',
-                   'новый уренгой',
-                   'ногинск',
-                   'нолинск',
-                   'норильск',
-                   'ноябрьск',
-                   'нурлат',
-                   'нытва',
-                   'нюрба',
-                   'нягань',
-                   'нязепетровск',
-                   'няндома'},
-             'о': {'облучье',
-                   'обнинск',
-                   'обоянь',
-                   'обь',
-                   'одинцово',
-                   'ожерелье',
-                   'озёрск',
-                   'озёры',
-                   'октябрьск',
-                   'октябрьский',
-                   'окуловка',
-                   'оленегорск',
-                   'олонец',
-                   'олёкминск',
-                   'омск',
-                   'омутнинск',
-                   'онега',
-                   'опочка',
-                   'оренбург',
-                   'орехово-зуево',
-                   'орлов',
-                   'орск',
-                   'орёл',
-                   'оса',
-                   'осинники',
-                   'осташков',
-                   'остров',
-                   'островной',
-                   'острогожск',
-                   'отрадное',
-                   'отрадный',
-                   'оха',
-                   'оханск',
-                   'очёр'},
-             'п': {'павлово',
-                   'павловск',
-                   'павловский посад',
-                   'палласовка',
-                   'партизанск',
-                   'певек',
-                   'пенза',
-                   'первомайск',
-                   'первоуральск',
-                   'перевоз',
-                   'пересвет',
-                   'переславль-залесский',
-                   'пермь',
-                   'пестово',
-                   'петергоф',
-                   'петров вал',
-                   'петровск',
-                   'петровск-забайкальский',
-                   'петрозаводск',
-                   'петропавловск-камчатский',
-                   'петухово',
-                   'петушки',
-                   'печора',
-                   'печоры',
-                   'пикалёво',
-                   'пионерский',
-                   'питкяранта',
-                   'плавск',
-                   'пласт',
-                   'плёс',
-                   'поворино',
-                   'подольск',
-                   'подпорожье',
-                   'покачи',
-                   'покров',
-                   'покровск',
-                   'полевской',
-                   'полесск',
-                   'полысаево',
-                   'полярные зори',
-                   'полярный',
-                   'поронайск',
-                   'порхов',
-                   'похвистнево',
-                   'почеп',
-                   'починок',
-                   'пошехонье',
-                   'правдинск',
-                   'приволжск',
-                   'приморск',
-                   'приморско-ахтарск',
-                   'приозерск',
-                   'прокопьевск',
-                   'пролетарск',
-                   'протвино',
-                   'прохладный',
-                   'псков',
-                   'пугачёв',
-                   'пудож',
-                   'пустошка',
-                   'пучеж',
-                   'пушкин',
-                   'пушкино',
-                   'пущино',
-                   'пыталово',
-                   'пыть-ях',
-                   'пятигорск'},
-             'р': {'радужный',
-                   'райчихинск',
-                   'раменское',
-                   'рассказово',
-                   'ревда',
-                   'реж',
-                   'реутов',
-                   'ржев',
-                   'родники',
-                   'рославль',
-                   'россошь',
-                   'ростов',
-                   'ростов-на-дону',
-                   'рошаль',
-                   'ртищево',
-                   'рубцовск',
-                   'рудня',
-                   'руза',
-                   'рузаевка',
-                   'рыбинск',
-                   'рыбное',
-                   'рыльск',
-                   'ряжск',
-                   'рязань'},
-             'с': {'салават',
-                   'салаир',
-                   'салехард',
-                   'сальск',
-                   'самара',
-                   'санкт-петербург',
-                   'саранск',
-                   'сарапул',
-                   'саратов',
-                   'саров',
-                   'сасово',
-                   'сатка',
-                   'сафоново',
-                   'саяногорск',
-                   'саянск',
-                   'светлогорск',
-                   'светлоград',
-                   'светлый',
-                   'светогорск',
-                   'свирск',
-                   'свободный',
-                   'себеж',
-                   'северо-курильск',
-                   'северобайкальск',
-                   'северодвинск',
-                   'североморск',
-                   'североуральск',
-                   'северск',
-                   'севск',
-                   'сегежа',
-                   'сельцо',
-                   'семикаракорск',
-                   'семилуки',
-                   'семёнов',
-                   'сенгилей',
-                   'серафимович',
-                   'сергач',
-                   'сергиев посад',
-                   'сердобск',
-                   'серов',
-                   'серпухов',
-                   'сертолово',
-                   'сестрорецк',
-                   'сибай',
-                   'сим',
-                   'сковородино',
-                   'скопин',
-                   'славгород',
-                   'славск',
-                   'славянск-на-кубани',
-                   'сланцы',
-                   'слободской',
-                   'слюдянка',
-                   'смоленск',
-                   'снежинск',
-                   'снежногорск',
-                   'собинка',
-                   'советск',
-                   'советская гавань',
-                   'советский',
-                   'сокол',
-                   'солигалич',
-                   'соликамск',
-                   'солнечногорск',
-                   'соль-илецк',
-                   'сольвычегодск',
-                   'сольцы',
-                   'сорочинск',
-                   'сорск',
-                   'сортавала',
-                   'сосенский',
-                   'сосновка',
-                   'сосновоборск',
-                   'сосновый бор',
-                   'сосногорск',
-                   'сочи',
-                   'спас-деменск',
-                   'спас-клепики',
-                   'спасск',
-                   'спасск-дальний',
-                   'спасск-рязанский',
-                   'среднеколымск',
-                   'среднеуральск',
-                   'сретенск',
-                   'ставрополь',
-                   'старая купавна',
-                   'старая русса',
-                   'старица',
-                   'стародуб',
-                   'старый оскол',
-                   'стерлитамак',
-                   'стрежевой',
-                   'строитель',
-                   'струнино',
-                   'ступино',
-                   'суворов',
-                   'суджа',
-                   'судогда',
-                   'суздаль',
-                   'суоярви',
-                   'сураж',
-                   'сургут',
-                   'суровикино',
-                   'сурск',
-                   'сусуман',
-                   'сухиничи',
-                   'сухой лог',
-                   'сызрань',
-                   'сыктывкар',
-                   'сысерть',
-                   'сычёвка',
-                   'сясьстрой'},
-             'т': {'тавда',
-                   'таганрог',
-                   'тайга',
-                   'тайшет',
-                   'талдом',
-                   'талица',
-                   'тамбов',
-                   'тара',
-                   'тарко-сале',
-                   'таруса',
-                   'татарск',
-                   'таштагол',
-                   'тверь',
-                   'теберда',
-                   'тейково',
-                   'темников',
-                   'темрюк',
-                   'терек',
-                   'тетюши',
-                   'тимашёвск',
-                   'тихвин',
-                   'тихорецк',
-                   'тобольск',
-                   'тогучин',
-                   'тольятти',
-                   'томари',
-                   'томмот',
-                   'томск',
-                   'топки',
-                   'торжок',
-                   'торопец',
-                   'тосно',
-                   'тотьма',
-                   'троицк',
-                   'трубчевск',
-                   'трёхгорный',
-                   'туапсе',
-                   'туймазы',
-                   'тула',
-                   'тулун',
-                   'туран',
-                   'туринск',
-                   'тутаев',
-                   'тында',
-                   'тырныауз',
-                   'тюкалинск',
-                   'тюмень'},
-             'у': {'уварово',
-                   'углегорск',
-                   'углич',
-                   'удачный',
-                   'удомля',
-                   'ужур',
-                   'узловая',
-                   'улан-удэ',
-                   'ульяновск',
-                   'унеча',
-                   'урай',
-                   'урень',
-                   'уржум',
-                   'урус-мартан',
-                   'урюпинск',
-                   'усинск',
-                   'усмань',
-                   'усолье',
-                   'усолье-сибирское',
-                   'уссурийск',
-                   'усть-джегута',
-                   'усть-илимск',
-                   'усть-катав',
-                   'усть-кут',
-                   'усть-лабинск',
-                   'устюжна',
-                   'уфа',
-                   'ухта',
-                   'учалы',
-                   'уяр'},
-             'ф': {'фурманов', 'фролово', 'фрязино', 'фокино', 'фатеж'},
-             'х': {'хабаровск',
-                   'хадыженск',
-                   'ханты-мансийск',
-                   'харабали',
-                   'харовск',
-                   'хасавюрт',
-                   'хвалынск',
-                   'хилок',
-                   'химки',
-                   'холм',
-                   'холмск',
-                   'хотьково'},
-             'ц': {'цивильск', 'цимлянск'},
-             'ч': {'чадан',
-                   'чайковский',
-                   'чапаевск',
-                   'чаплыгин',
-                   'чебаркуль',
-                   'чебоксары',
-                   'чегем',
-                   'чекалин',
-                   'челябинск',
-                   'чердынь',
-                   'черемхово',
-                   'черепаново',
-                   'череповец',
-                   'черкесск',
-                   'черноголовка',
-                   'черногорск',
-                   'чернушка',
-                   'черняховск',
-                   'чехов',
-                   'чистополь',
-                   'чита',
-                   'чкаловск',
-                   'чудово',
-                   'чулым',
-                   'чусовой',
-                   'чухлома',
-                   'чёрмоз'},
-             'ш': {'шагонар',
-                   'шадринск',
-                   'шали',
-                   'шарыпово',
-                   'шарья',
-                   'шатура',
-                   'шахты',
-                   'шахтёрск',
-                   'шахунья',
-                   'шацк',
-                   'шебекино',
-                   'шелехов',
-                   'шенкурск',
-                   'шилка',
-                   'шимановск',
-                   'шиханы',
-                   'шлиссельбург',
-                   'шумерля',
-                   'шумиха',
-                   'шуя'},
-             'щ': {'щигры', 'щёкино', 'щучье', 'щербинка', 'щёлково'},
-             'э': {'электрогорск',
-                   'электросталь',
-                   'электроугли',
-                   'элиста',
-                   'энгельс',
-                   'эртиль'},
-             'ю': {'юбилейный',
-                   'югорск',
-                   'южа',
-                   'южно-сахалинск',
-                   'южно-сухокумск',
-                   'южноуральск',
-                   'юрга',
-                   'юрьев-польский',
-                   'юрьевец',
-                   'юрюзань',
-                   'юхнов'},
-             'я': {'ядрин',
-                   'якутск',
-                   'ялуторовск',
-                   'янаул',
-                   'яранск',
-                   'яровое',
-                   'ярославль',
-                   'ярцево',
-                   'ясногорск',
-                   'ясный',
-                   'яхрома'}}
+import argparse
+import csv
+import mmap
+import os
+import struct
+import tempfile
+
+from random import randrange
+
+MAGIC = b'CIDX'
+VERSION = 2
+HEADER = struct.Struct('<4sHHI')
+LETTER = struct.Struct('<4I')
+OFFSET = struct.Struct('<I')
+IMPOSSIBLE_LETTERS = 'йьыъ'
+DATASETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'datasets')
+DELIMITERS = {'.csv': ',', '.tsv': '\t'}
+
+_indexes = {}
+
+
+def normalize_name(name):
+    name = ' '.join(name.lower().replace('ё', 'е').split())
+    return '-'.join(part.strip() for part in name.split('-'))
+
+
+def read_source(path, column='name', population_column=None, min_population=0):
+    delimiter = DELIMITERS.get(os.path.splitext(path)[1].lower())
+    with open(path, encoding='utf-8', newline='') as f:
+        if delimiter is None:
+            rows = ({column: line} for line in f)
+        else:
+            rows = csv.DictReader(f, delimiter=delimiter)
+        for row in rows:
+            if population_column is not None:
+                try:
+                    if float(row[population_column]) < min_population:
+                        continue
+                except ValueError:
+                    continue
+            name = normalize_name(row[column])
+            if name:
+                yield name
+
+
+def end_letter(name, letters):
+    for char in reversed(name):
+        if char in letters and char not in IMPOSSIBLE_LETTERS:
+            return char
+
+
+def build_index(names, path):
+    names = sorted(set(names))
+    letters = {}
+    for i, name in enumerate(names):
+        start, count = letters.get(name[0], (i, 0))
+        letters[name[0]] = (start, count + 1)
+    ends = [end_letter(name, letters) for name in names]
+    end_counts = {}
+    for end in ends:
+        end_counts[end] = end_counts.get(end, 0) + 1
+
+    blob = bytearray()
+    offsets = [0]
+    for name in names:
+        blob += name.encode()
+        offsets.append(len(blob))
+
+    fd, tmp_path = tempfile.mkstemp(prefix=f"{os.path.basename(path)}.", suffix='.tmp',
+                                    dir=os.path.dirname(path) or '.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(letters), len(names)))
+            for letter, (start, count) in sorted(letters.items()):
+                f.write(LETTER.pack(ord(letter), start, count, end_counts.get(letter, 0)))
+            f.write(struct.pack(f'<{len(offsets)}I', *offsets))
+            f.write(struct.pack(f'<{len(ends)}I', *(ord(end) if end else 0 for end in ends)))
+            f.write(blob)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+class CityIndex:
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, n_letters, self.size = HEADER.unpack_from(self._mm)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"'{path}' is not a city index of version {VERSION}.")
+        self.buckets = {}
+        self.end_counts = {}
+        pos = HEADER.size
+        for _ in range(n_letters):
+            code, start, count, end_count = LETTER.unpack_from(self._mm, pos)
+            self.buckets[chr(code)] = (start, count)
+            self.end_counts[chr(code)] = end_count
+            pos += LETTER.size
+        self._offsets = pos
+        self._ends = pos + OFFSET.size * (self.size + 1)
+        self._blob = self._ends + OFFSET.size * self.size
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, city_id):
+        start, end = struct.unpack_from('<2I', self._mm, self._offsets + OFFSET.size * city_id)
+        return self._mm[self._blob + start:self._blob + end].decode()
+
+    def bucket(self, letter):
+        return self.buckets.get(letter, (0, 0))
+
+    def end_letter(self, city_id):
+        code, = OFFSET.unpack_from(self._mm, self._ends + OFFSET.size * city_id)
+        return chr(code) if code else None
+
+    def find(self, name):
+        if not name:
+            return
+        lo, hi = self.bucket(name[0])
+        hi += lo
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self[mid] < name:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self) and self[lo] == name:
+            return lo
+
+
+class GameState:
+    def __init__(self, index):
+        self.index = index
+        self.remaining = {}
+        self.ends = {}
+        self.slots = {}
+        self.positions = {}
+
+    def count(self, letter):
+        return self.remaining.get(letter, self.index.bucket(letter)[1])
+
+    def end_count(self, letter):
+        return self.ends.get(letter, self.index.end_counts.get(letter, 0))
+
+    def is_free(self, name):
+        city_id = self.index.find(name)
+        if city_id is None:
+            return False
+        start, _ = self.index.bucket(name[0])
+        return self.positions.get(city_id, city_id) < start + self.count(name[0])
+
+    def _take(self, letter, slot):
+        start, _ = self.index.bucket(letter)
+        last = start + self.count(letter) - 1
+        city_id = self.slots.get(slot, slot)
+        last_id = self.slots.get(last, last)
+        self.slots[slot], self.positions[last_id] = last_id, slot
+        self.slots[last], self.positions[city_id] = city_id, last
+        self.remaining[letter] = last - start
+        end = self.index.end_letter(city_id)
+        if end is not None:
+            self.ends[end] = self.end_count(end) - 1
+        return city_id
+
+    def _score(self, city_id, letter):
+        end = self.index.end_letter(city_id)
+        if end is None:
+            return -1, 0
+        return self.count(end) - (end == letter), -self.end_count(end)
+
+    def use(self, name):
+        city_id = self.index.find(name)
+        self._take(name[0], self.positions.get(city_id, city_id))
+
+    def pick(self, letter, samples=1):
+        start, _ = self.index.bucket(letter)
+        count = self.count(letter)
+        if not count:
+            return
+        best = best_score = None
+        for _ in range(min(samples, count)):
+            slot = start + randrange(count)
+            score = self._score(self.slots.get(slot, slot), letter)
+            if best is None or score < best_score:
+                best, best_score = slot, score
+        return self.index[self._take(letter, best)]
+
+
+def is_fresh(path, source):
+    if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(source):
+        return False
+    with open(path, 'rb') as f:
+        magic, version, *_ = HEADER.unpack(f.read(HEADER.size))
+    return magic == MAGIC and version == VERSION
+
+
+def load_index(name):
+    source = os.path.join(DATASETS_DIR, f"{name}.txt")
+    path = os.path.join(DATASETS_DIR, f"{name}.idx")
+    if os.path.exists(source) and not is_fresh(path, source):
+        build_index(read_source(source), path)
+    return CityIndex(path)
+
+
+def available_datasets():
+    return sorted({os.path.splitext(f)[0] for f in os.listdir(DATASETS_DIR) if f.endswith(('.idx', '.txt'))})
+
+
+def get_index(name):
+    if name not in _indexes:
+        _indexes[name] = load_index(name)
+    return _indexes[name]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a city index for the /cities game.")
+    parser.add_argument('source', help="plain list (.txt, one name per line) or a .csv/.tsv table")
+    parser.add_argument('--name', help="dataset name, defaults to the source file name")
+    parser.add_argument('--column', default='name', help="column with city names in .csv/.tsv sources")
+    parser.add_argument('--population-column', help="column with city population")
+    parser.add_argument('--min-population', type=float, default=0, help="skip smaller cities")
+    args = parser.parse_args()
+
+    name = args.name or os.path.splitext(os.path.basename(args.source))[0]
+    path = os.path.join(DATASETS_DIR, f"{name}.idx")
+    build_index(read_source(args.source, args.column, args.population_column, args.min_population), path)
+    print(f"{name}: {len(CityIndex(path))} cities -> {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+from datetime import datetime as dt, time
+
+import ephem
+import pytz
+
+import ephem_cache
+
+PLANETS = tuple(name for _, kind, name in ephem._libastro.builtin_planets() if kind == 'Planet')
+
+
+class DailySky:
+    def __init__(self, timezone='UTC'):
+        self.tz = pytz.timezone(timezone)
+        self._day = (None, {})
+
+    def today(self):
+        return dt.now(self.tz).strftime("%Y/%m/%d")
+
+    def precompute(self, context=None):
+        date = self.today()
+        self._day = date, {planet: ephem_cache.constellation(planet, date) for planet in PLANETS}
+
+    def constellation(self, planet):
+        date = self.today()
+        day, constellations = self._day
+        if day == date and planet in constellations:
+            return constellations[planet]
+        return ephem_cache.constellation(planet, date)
+
+    def schedule(self, job_queue):
+        job_queue.run_daily(self.precompute, time(tzinfo=self.tz), name="daily-sky")
+        job_queue.run_once(self.precompute, 0, name="daily-sky-startup")
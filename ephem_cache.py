@@ -0,0 +1,131 @@
+import math
+import os
+import tempfile
+import threading
+
+from array import array
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+
+import ephem
+
+MAX_POINTS = 10000
+PHASES = (
+    ('new moon', ephem.next_new_moon),
+    ('first quarter', ephem.next_first_quarter_moon),
+    ('full moon', ephem.next_full_moon),
+    ('last quarter', ephem.next_last_quarter_moon),
+)
+
+
+@lru_cache(maxsize=1024)
+def constellation(body, date):
+    *_, name = ephem.constellation(getattr(ephem, body)(date))
+    return name
+
+
+def ephemeris(body, start, end, step=1.0):
+    start, end = float(ephem.Date(start)), float(ephem.Date(end))
+    if not step > 0:
+        raise ValueError("Step must be positive.")
+    points = int((end - start) / step) + 1 if end >= start else 0
+    if points > MAX_POINTS:
+        raise ValueError(f"Too many points, the limit is {MAX_POINTS}.")
+    body = getattr(ephem, body)()
+    for i in range(points):
+        date = start + i * step
+        body.compute(date)
+        _, name = ephem.constellation(body)
+        yield ephem.Date(date), math.degrees(body.ra), math.degrees(body.dec), name
+
+
+class MoonPhaseIndex:
+    def __init__(self, first_year=1900, last_year=2100, path=None):
+        self.first_year = first_year
+        self.last_year = last_year
+        self.path = path
+        self.start = ephem.Date(f"{first_year}/1/1")
+        self._phases = None
+        self._lock = threading.Lock()
+
+    def build(self):
+        end = ephem.Date(f"{self.last_year + 1}/1/1")
+        phases = []
+        for _, next_phase in PHASES:
+            instants = array('d')
+            date = next_phase(self.start)
+            while date < end:
+                instants.append(date)
+                date = next_phase(date)
+            phases.append(instants)
+        return phases
+
+    def _load(self):
+        with open(self.path, 'rb') as f:
+            header = array('I')
+            header.fromfile(f, 2 + len(PHASES))
+            if tuple(header[:2]) != (self.first_year, self.last_year):
+                raise ValueError(f"'{self.path}' covers other years.")
+            phases = []
+            for count in header[2:]:
+                instants = array('d')
+                instants.fromfile(f, count)
+                phases.append(instants)
+        return phases
+
+    def _save(self, phases):
+        fd, tmp_path = tempfile.mkstemp(prefix=f"{os.path.basename(self.path)}.", suffix='.tmp',
+                                        dir=os.path.dirname(self.path) or '.')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                array('I', [self.first_year, self.last_year] + [len(instants) for instants in phases]).tofile(f)
+                for instants in phases:
+                    instants.tofile(f)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    @property
+    def phases(self):
+        if self._phases is None:
+            with self._lock:
+                if self._phases is None:
+                    try:
+                        self._phases = self._load()
+                    except (OSError, EOFError, ValueError, TypeError):
+                        self._phases = self.build()
+                        if self.path:
+                            self._save(self._phases)
+        return self._phases
+
+    def covers(self, date):
+        return self.start <= ephem.Date(date) < min(instants[-1] for instants in self.phases)
+
+    def next(self, phase, date):
+        date = ephem.Date(date)
+        instants = self.phases[phase]
+        i = bisect_right(instants, date)
+        if i == len(instants) or date < self.start:
+            return PHASES[phase][1](date)
+        return ephem.Date(instants[i])
+
+    def next_full_moon(self, date):
+        return self.next(2, date)
+
+    def current(self, date):
+        date = ephem.Date(date)
+        latest = None
+        for phase, instants in enumerate(self.phases):
+            i = bisect_right(instants, date)
+            if i and (latest is None or instants[i - 1] > latest[0]):
+                latest = instants[i - 1], phase
+        return None if latest is None else latest[1]
+
+    def between(self, start, end):
+        start, end = ephem.Date(start), ephem.Date(end)
+        found = []
+        for phase, instants in enumerate(self.phases):
+            found += [(ephem.Date(instants[i]), PHASES[phase][0])
+                      for i in range(bisect_left(instants, start), bisect_left(instants, end))]
+        return sorted(found)
@@ -0,0 +1,102 @@
+import logging
+import queue
+import sqlite3
+import threading
+
+from collections import defaultdict
+
+NEW_GAME = 'game'
+
+
+class MemoryBackend:
+    def __init__(self):
+        self.events = defaultdict(list)
+
+    def append(self, records):
+        for chat_id, kind, value in records:
+            if kind == NEW_GAME:
+                self.events[chat_id].clear()
+            self.events[chat_id].append((kind, value))
+
+    def load(self, chat_id):
+        return list(self.events.get(chat_id, ()))
+
+    def close(self):
+        pass
+
+
+class SqliteBackend:
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS game_events ("
+                               "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                               "chat_id INTEGER NOT NULL, kind TEXT NOT NULL, value TEXT)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS game_events_chat ON game_events (chat_id, id)")
+
+    def append(self, records):
+        with self._lock, self._conn:
+            for chat_id, kind, value in records:
+                if kind == NEW_GAME:
+                    self._conn.execute("DELETE FROM game_events WHERE chat_id = ?", (chat_id,))
+                self._conn.execute("INSERT INTO game_events (chat_id, kind, value) VALUES (?, ?, ?)",
+                                   (chat_id, kind, value))
+
+    def load(self, chat_id):
+        with self._lock:
+            return self._conn.execute("SELECT kind, value FROM game_events WHERE chat_id = ? ORDER BY id",
+                                      (chat_id,)).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class GameStore:
+    def __init__(self, backend, batch_size=100, flush_interval=1.0):
+        self.backend = backend
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_batches, name="game-store", daemon=True)
+        self._writer.start()
+
+    def record(self, chat_id, kind, value=None):
+        self._queue.put((chat_id, kind, value))
+
+    def load(self, chat_id):
+        return self.backend.load(chat_id)
+
+    def _write_batches(self):
+        stop = False
+        while not stop:
+            batch = []
+            try:
+                batch.append(self._queue.get(timeout=self.flush_interval))
+                while len(batch) < self.batch_size:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            if None in batch:
+                stop = True
+                batch = [record for record in batch if record is not None]
+            if batch:
+                try:
+                    self.backend.append(batch)
+                except Exception:
+                    logging.exception("Failed to store %d game events", len(batch))
+
+    def close(self):
+        self._queue.put(None)
+        self._writer.join()
+        self.backend.close()
+
+
+def open_store(url):
+    if url == 'memory://':
+        return GameStore(MemoryBackend())
+    if url.startswith('sqlite:///'):
+        return GameStore(SqliteBackend(url[len('sqlite:///'):]))
+    raise ValueError(f"Unknown game store '{url}'.")
@@ -0,0 +1,148 @@
+import argparse
+import gc
+import random
+import statistics
+import time
+import tracemalloc
+
+from collections import defaultdict
+
+import settings
+
+from sharding import DryRunBot, fake_update
+from telegram import Update
+from telegram.ext import Dispatcher
+
+SCRIPT = [
+    "/start",
+    "/stats_on",
+    "Hello there, how are you doing today?",
+    "/planet Mars",
+    "/next_full_moon 2021-06-01",
+    "/moon 2021-06-01",
+    "/moon_calendar 2021",
+    "/ephemeris Mars 2021-01-01 2021-01-05",
+    "/wordcount Привет, как дела? Всё хорошо!",
+    "/textstats The quick brown fox jumps over the lazy dog. The dog sleeps!",
+    "/calc 2+2*2",
+    "/calc_mode exact",
+    "/calc 1/3 + 1/6",
+    "/cities_mode",
+    "/top",
+]
+YOUR_TURN = ", Ваш ход."
+
+
+class RecordingBot(DryRunBot):
+    def __init__(self, token):
+        super().__init__(token)
+        self.last_reply = {}
+        self.sent = 0
+
+    def send_message(self, chat_id, text, *args, **kwargs):
+        self.last_reply[chat_id] = text
+        self.sent += 1
+
+    def send_document(self, chat_id, document, *args, **kwargs):
+        self.last_reply[chat_id] = kwargs.get('filename')
+        self.sent += 1
+
+
+class CitiesPlayer:
+    def __init__(self, lpmegabot, dataset):
+        self.normalize = lpmegabot.cities.normalize_name
+        self.game = lpmegabot.CitiesGame(lpmegabot.cities.GameState(lpmegabot.cities.get_index(dataset)))
+
+    def move(self, bot_reply):
+        state = self.game.state
+        letter = None
+        if bot_reply and bot_reply.endswith(YOUR_TURN):
+            name = self.normalize(bot_reply[:-len(YOUR_TURN)])
+            if state.is_free(name):
+                state.use(name)
+            letter = self.game._get_letter(name, self.game.last)
+        if letter is None or not state.count(letter):
+            letter = random.choice([letter for letter in state.index.buckets if state.count(letter)])
+        return f"/cities {state.pick(letter)}"
+
+
+class LoadTest:
+    def __init__(self, lpmegabot, turns):
+        self.lpmegabot = lpmegabot
+        self.turns = turns
+        self.bot = RecordingBot("123456:load-test")
+        self.dp = Dispatcher(self.bot, None, workers=0)
+        lpmegabot.setup_dispatcher(self.dp)
+        self.latencies = defaultdict(list)
+        self.update_id = 0
+
+    def run(self, chat_ids):
+        players = {chat_id: CitiesPlayer(self.lpmegabot, self.lpmegabot.CITIES_DATASET) for chat_id in chat_ids}
+        for step in range(len(SCRIPT) + self.turns):
+            for chat_id in chat_ids:
+                if step < len(SCRIPT):
+                    text = SCRIPT[step]
+                else:
+                    text = players[chat_id].move(self.bot.last_reply.get(chat_id))
+                self.update_id += 1
+                update = Update.de_json(fake_update(self.update_id, chat_id, text), self.bot)
+                start = time.perf_counter()
+                self.dp.process_update(update)
+                self.latencies[text.split()[0] if text.startswith('/') else 'text'].append(
+                    time.perf_counter() - start)
+
+
+def percentiles(values):
+    if len(values) < 2:
+        return values[0], values[0]
+    cuts = statistics.quantiles(values, n=100, method='inclusive')
+    return cuts[49], cuts[98]
+
+
+def report(test, elapsed):
+    total = sum(len(values) for values in test.latencies.values())
+    p50, p99 = percentiles([value for values in test.latencies.values() for value in values])
+    print(f"{total} updates in {elapsed:.2f} s: {total / elapsed:.0f} updates/s, "
+          f"p50 {p50 * 1000:.2f} ms, p99 {p99 * 1000:.2f} ms, {test.bot.sent} replies")
+    print(f"{'command':<16}{'count':>8}{'p50 ms':>10}{'p99 ms':>10}")
+    for command, values in sorted(test.latencies.items()):
+        p50, p99 = percentiles(values)
+        print(f"{command:<16}{len(values):>8}{p50 * 1000:>10.2f}{p99 * 1000:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay every command through the dispatcher without Telegram.")
+    parser.add_argument('--chats', type=int, default=1000, help="simulated chats")
+    parser.add_argument('--turns', type=int, default=20, help="/cities moves per chat after the scripted commands")
+    parser.add_argument('--memory-chats', type=int, default=200, help="chats to replay again under tracemalloc")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    settings.GAME_STORE = 'memory://'
+    settings.CHAT_STATS_PATH = ':memory:'
+    random.seed(args.seed)
+    import lpmegabot
+
+    try:
+        test = LoadTest(lpmegabot, args.turns)
+        test.run([-1])
+        test.latencies.clear()
+        start = time.perf_counter()
+        test.run(range(1, args.chats + 1))
+        report(test, time.perf_counter() - start)
+
+        if args.memory_chats:
+            gc.collect()
+            tracemalloc.start()
+            before = tracemalloc.take_snapshot()
+            test.run(range(args.chats + 1, args.chats + args.memory_chats + 1))
+            gc.collect()
+            growth = sum(stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(before, 'filename'))
+            tracemalloc.stop()
+            print(f"Memory: {growth / args.memory_chats / 1024:.1f} KiB per chat")
+    finally:
+        lpmegabot.close_resources()
+
+
+if __name__ == '__main__':
+    main()
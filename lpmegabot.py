@@ -1,58 +1,133 @@
 import ephem
 import logging
+import math
+import threading
 
+import bot_logging
+import calc_engine
+import chat_stats
 import cities
+import clock
+import ephem_cache
+import game_store
+import metrics
+import profiler
+import replies
 import settings
+import text_tokenizer
 
 from datetime import datetime as dt
-from random import choice
-from string import punctuation
+from urllib.request import urlopen
+from outbox import MAX_MESSAGE_LENGTH, Outbox
+from replies import reply, reply_document
 from telegram.ext import Updater, CommandHandler, MessageHandler, Filters
 
 API_KEY = settings.API_KEY
-DATE_TODAY = dt.today().strftime("%Y/%m/%d")
-logging.basicConfig(format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-                    level=logging.INFO,
-                    filename="bot.log")
-
-CITIES = cities.ru_cities
+SKY = clock.DailySky(getattr(settings, 'TIMEZONE', 'UTC'))
+MOON_PHASES = ephem_cache.MoonPhaseIndex(*getattr(settings, 'MOON_PHASE_YEARS', (1900, 2100)),
+                                         path=getattr(settings, 'MOON_PHASES_PATH', 'moon_phases.bin'))
+EPHEMERIS_TEXT_ROWS = getattr(settings, 'EPHEMERIS_TEXT_ROWS', 20)
+STEP_UNITS = {'d': 1, 'h': 1 / 24, 'm': 1 / 1440}
+CALC_POOL = calc_engine.CalcPool(getattr(settings, 'CALC_WORKERS', 2), getattr(settings, 'CALC_TIMEOUT', 1.0),
+                                 getattr(settings, 'CALC_BATCH_TIMEOUT', calc_engine.MAX_BATCH_TIMEOUT))
+CALC_FILE_LIMIT = getattr(settings, 'CALC_FILE_LIMIT', 1 << 20)
+WORDCOUNT_RULES = getattr(settings, 'WORDCOUNT_RULES', {})
+TEXTSTATS_TOP = getattr(settings, 'TEXTSTATS_TOP', 10)
+TEXTSTATS_TIMEOUT = getattr(settings, 'TEXTSTATS_TIMEOUT', 30)
+CITIES_DATASET = getattr(settings, 'CITIES_DATASET', 'ru')
+CITIES_SAMPLES = getattr(settings, 'CITIES_SAMPLES', 8)
+GAME_STORE = None
+CHAT_STATS = None
+CHAT_STATS_FLUSH = getattr(settings, 'CHAT_STATS_FLUSH', 60)
+METRICS = metrics.Metrics()
+METRICS_ADDRESS = getattr(settings, 'METRICS_ADDRESS', ('127.0.0.1', 9108))
+METRICS_DUMP = getattr(settings, 'METRICS_DUMP', 'metrics.prom')
+METRICS_DUMP_INTERVAL = getattr(settings, 'METRICS_DUMP_INTERVAL', 60)
+ADMIN_IDS = set(getattr(settings, 'ADMIN_IDS', ()))
+PROFILE_MAX_SECONDS = getattr(settings, 'PROFILE_MAX_SECONDS', 60)
+PROFILE_LOCK = threading.Lock()
 
 
 def greet_user(update, context):
     text = "Вызван /start"
-    update.message.reply_text(text)
+    reply(update, text)
 
 
 def talk_to_me(update, context):
     text = update.message.text
-    update.message.reply_text(text)
+    chat_id = update.effective_chat.id
+    if CHAT_STATS.is_enabled(chat_id):
+        user = update.effective_user
+        CHAT_STATS.record(chat_id, user.id, user.first_name, text_tokenizer.count_words(text, **WORDCOUNT_RULES))
+    reply(update, text)
+
+
+def stats_on(update, context):
+    CHAT_STATS.enable(update.effective_chat.id)
+    reply(update, "Word counting is on for this chat. Use /top to see the most talkative members.")
+
+
+def stats_off(update, context):
+    CHAT_STATS.enable(update.effective_chat.id, False)
+    reply(update, "Word counting is off for this chat.")
+
+
+def top(update, context):
+    chat_id = update.effective_chat.id
+    try:
+        k = min(int(context.args[0]), 50) if context.args else 10
+    except ValueError:
+        k = 10
+    leaders = CHAT_STATS.top(chat_id, k)
+    if not leaders:
+        enabled = CHAT_STATS.is_enabled(chat_id)
+        reply(update, "Nobody has written anything yet." if enabled else "Word counting is off. Send /stats_on.")
+        return
+    reply(update, '\n'.join(f"{place}. {name}: {words} words in {messages} messages"
+                            for place, (name, words, messages) in enumerate(leaders, 1)))
 
 
 def get_constelation(update, context):
     *_, planet = context.args
     planet = planet.lower().capitalize()
-    try:
-        p = getattr(ephem, planet)(DATE_TODAY)
-    except AttributeError:
-        update.message.reply_text("I don't know this planet. Maybe you meant the Moon?")
+    if not hasattr(ephem, planet):
+        reply(update, "I don't know this planet. Maybe you meant the Moon?")
         planet = "Moon"
-        p = getattr(ephem, planet)(DATE_TODAY)
     try:
-        *_, constellation = ephem.constellation(p)
-        update.message.reply_text(f"Today {planet.capitalize()} is in the constellation of {constellation}.")
+        constellation = SKY.constellation(planet)
+        reply(update, f"Today {planet.capitalize()} is in the constellation of {constellation}.")
     except TypeError:
-        update.message.reply_text("It's not a planet. Enter the name of a planet in the Solar System.")
+        reply(update, "It's not a planet. Enter the name of a planet in the Solar System.")
 
 
 def wordcount(update, context):
     text = ' '.join(context.args)
-    for char in punctuation:
-        text = text.replace(char, '')
-    n_words = len(text.split())
+    n_words = text_tokenizer.count_words(text, **WORDCOUNT_RULES)
     spec_cases = {0: "No word.", 1: "1 word."}
     result = spec_cases.get(n_words, f"{n_words} words.")
 
-    update.message.reply_text(result)
+    reply(update, result)
+
+
+def textstats(update, context):
+    if not context.args:
+        reply(update, "Send /textstats with a text, or a document with the /textstats caption.")
+        return
+    stats = text_tokenizer.TextStats(**WORDCOUNT_RULES)
+    stats.feed(update.message.text.split(maxsplit=1)[1])
+    reply(update, stats.finish().summary(TEXTSTATS_TOP))
+
+
+def textstats_file(update, context):
+    stats = text_tokenizer.TextStats(**WORDCOUNT_RULES)
+    file = context.bot.get_file(update.message.document.file_id)
+    try:
+        with urlopen(file.file_path, timeout=TEXTSTATS_TIMEOUT) as response:
+            stats.feed_stream(response)
+    except OSError:
+        reply(update, "I couldn't download the file. Try again later.")
+        return
+    reply(update, stats.finish().summary(TEXTSTATS_TOP))
 
 
 def get_next_full_moon(update, context):
@@ -61,12 +136,89 @@ def get_next_full_moon(update, context):
     try:
         norm_date = dt.strptime(user_date, '%Y-%m-%d')
     except ValueError:
-        norm_date = DATE_TODAY
-        update.message.reply_text("Enter the date in the format 'YYYY-MM-DD'.\n"
-                                  "Next full moon relative to today:")
+        norm_date = SKY.today()
+        reply(update, "Enter the date in the format 'YYYY-MM-DD'.\n"
+                      "Next full moon relative to today:")
 
-    result = ephem.next_full_moon(norm_date)
-    update.message.reply_text(result)
+    result = MOON_PHASES.next_full_moon(norm_date)
+    reply(update, result)
+
+
+def get_moon(update, context):
+    user_date = context.args[0] if context.args else SKY.today().replace('/', '-')
+    try:
+        date = dt.strptime(user_date, '%Y-%m-%d')
+    except ValueError:
+        reply(update, "Enter the date in the format 'YYYY-MM-DD'.")
+        return
+    if not MOON_PHASES.covers(date):
+        reply(update, f"I know the Moon phases from {MOON_PHASES.first_year} to {MOON_PHASES.last_year} only.")
+        return
+
+    lines = []
+    current = MOON_PHASES.current(date)
+    if current is not None:
+        lines.append(f"{date:%Y-%m-%d}: the last phase was the {ephem_cache.PHASES[current][0]}.")
+    upcoming = sorted((MOON_PHASES.next(phase, date), name) for phase, (name, _) in enumerate(ephem_cache.PHASES))
+    lines += [f"Next {name}: {instant}" for instant, name in upcoming]
+    reply(update, '\n'.join(lines))
+
+
+def get_moon_calendar(update, context):
+    try:
+        year = int(context.args[0]) if context.args else int(SKY.today()[:4])
+    except ValueError:
+        reply(update, "Enter the year, e.g. /moon_calendar 2021.")
+        return
+    if not MOON_PHASES.first_year <= year <= MOON_PHASES.last_year:
+        reply(update, f"I know the Moon phases from {MOON_PHASES.first_year} to {MOON_PHASES.last_year} only.")
+        return
+
+    phases = MOON_PHASES.between(f"{year}/1/1", f"{year + 1}/1/1")
+    reply(update, '\n'.join(f"{instant}  {name}" for instant, name in phases))
+
+
+def parse_step(step):
+    if step[-1:].lower() in STEP_UNITS:
+        step = float(step[:-1]) * STEP_UNITS[step[-1].lower()]
+    else:
+        step = float(step)
+    if not math.isfinite(step):
+        raise ValueError(f"Step must be a finite number, not {step}.")
+    return step
+
+
+def get_ephemeris(update, context):
+    usage = "Usage: /ephemeris <planet> <YYYY-MM-DD> <YYYY-MM-DD> [step, e.g. 1d, 6h, 30m]"
+    if len(context.args) not in (3, 4):
+        reply(update, usage)
+        return
+    planet, start, end, *step = context.args
+    planet = planet.lower().capitalize()
+    try:
+        start = dt.strptime(start, '%Y-%m-%d')
+        end = dt.strptime(end, '%Y-%m-%d')
+        step = parse_step(step[0]) if step else 1.0
+    except ValueError:
+        reply(update, usage)
+        return
+    try:
+        rows = list(ephem_cache.ephemeris(planet, start, end, step))
+    except ValueError as e:
+        reply(update, str(e))
+        return
+    except (AttributeError, TypeError):
+        reply(update, "It's not a planet. Enter the name of a planet in the Solar System.")
+        return
+
+    if not rows:
+        reply(update, "The end date is earlier than the start date.")
+    elif len(rows) <= EPHEMERIS_TEXT_ROWS:
+        reply(update, '\n'.join(f"{date}  RA {ra:7.3f}  Dec {dec:+7.3f}  {name}" for date, ra, dec, name in rows))
+    else:
+        lines = ["date,ra_deg,dec_deg,constellation"]
+        lines += [f"{date},{ra:.5f},{dec:.5f},{name}" for date, ra, dec, name in rows]
+        reply_document(update, '\n'.join(lines).encode(), f"{planet.lower()}_ephemeris.csv")
 
 
 def prettify_name(name):
@@ -82,110 +234,279 @@ def prettify_name(name):
 
 
 class CitiesGame:
-    def __init__(self, remaining_cities):
+    def __init__(self, state, samples=1):
         self.bot_city = None
         self.notice = None
-        self.impossible_start_letters = 'йьыъ'
+        self.game_over = False
+        self.samples = samples
+        self.impossible_start_letters = cities.IMPOSSIBLE_LETTERS
         self.last = -1
         self.first = 0
-        self.remaining_cities = remaining_cities
+        self.state = state
 
     def _get_letter(self, word, pos):
-        if word is None:
+        word = cities.normalize_name(word or '')
+        if not word:
             return
-        word = word.lower()
-        if word[pos] not in self.impossible_start_letters:
-            letter = word[pos]
-        else:
-            letter = self._get_letter(word[:self.last], self.last)
-        return letter
+        buckets = self.state.index.buckets
+        if word[pos] not in self.impossible_start_letters and word[pos] in buckets:
+            return word[pos]
+        for letter in reversed(word[:self.last]):
+            if letter not in self.impossible_start_letters and letter in buckets:
+                return letter
 
     def logic(self, user_city, bot_city_prev):
         last_letter_prev = self._get_letter(bot_city_prev, self.last)
         first_letter = self._get_letter(user_city, pos=self.first)
         if bot_city_prev is None or (first_letter == last_letter_prev):
-            user_city = user_city.lower()
-            if user_city in self.remaining_cities.get(first_letter, (None,)):
-                self.remaining_cities[first_letter].remove(user_city)
+            user_city = cities.normalize_name(user_city)
+            if self.state.is_free(user_city):
+                self.state.use(user_city)
                 last_letter = self._get_letter(user_city, self.last)
-                self.bot_city = choice(list(self.remaining_cities.get(last_letter)))
-                self.remaining_cities[last_letter].remove(self.bot_city)
+                self.bot_city = self.state.pick(last_letter, self.samples)
+                if self.bot_city is None:
+                    self.game_over = True
+                    self.notice = "Мне нечего ответить. Вы победили!"
+                elif not self.state.count(self._get_letter(self.bot_city, self.last)):
+                    self.game_over = True
+                    self.notice = f"{prettify_name(self.bot_city)}. Вам нечего ответить, я победил!"
             else:
                 user_city = prettify_name(user_city)
-                self.notice = f"Город с названием '{user_city}' уже называли, либо его не существует в России."
+                self.notice = f"Город с названием '{user_city}' уже называли, либо его нет в списке."
         else:
-            self.notice = f"Введите название российского города на букву '{last_letter_prev}'."
-        return self.bot_city, self.remaining_cities, self.notice
+            self.notice = f"Введите название города на букву '{last_letter_prev}'."
+        return self.bot_city, self.state, self.notice
+
+
+def new_cities_game(chat_data, dataset, chat_id=None):
+    chat_data['cities_dataset'] = dataset
+    chat_data['cities_state'] = cities.GameState(cities.get_index(dataset))
+    chat_data.pop('bot_city_prev', None)
+    if chat_id is not None:
+        GAME_STORE.record(chat_id, game_store.NEW_GAME, dataset)
+    return chat_data['cities_state']
+
+
+def restore_cities_game(chat_data, chat_id):
+    events = GAME_STORE.load(chat_id)
+    if not events or events[0][0] != game_store.NEW_GAME or events[0][1] not in cities.available_datasets():
+        return new_cities_game(chat_data, CITIES_DATASET, chat_id)
+    state = new_cities_game(chat_data, events[0][1])
+    for kind, city in events[1:]:
+        if state.is_free(city):
+            state.use(city)
+        if kind == 'bot':
+            chat_data['bot_city_prev'] = city
+    return state
+
+
+def cities_mode(update, context):
+    datasets = cities.available_datasets()
+    current = context.chat_data.get('cities_dataset', CITIES_DATASET)
+    if not context.args:
+        response = f"Текущий список: {current}. Доступные списки: {', '.join(datasets)}."
+    elif context.args[0] not in datasets:
+        response = f"Списка '{context.args[0]}' нет. Доступные списки: {', '.join(datasets)}."
+    else:
+        new_cities_game(context.chat_data, context.args[0], update.effective_chat.id)
+        response = f"Новая игра по списку '{context.args[0]}'. Ваш ход."
+    reply(update, response)
 
 
 def cities_game(update, context):
-    game = CitiesGame(CITIES)
+    chat_id = update.effective_chat.id
+    state = context.chat_data.get('cities_state')
+    if state is None:
+        state = restore_cities_game(context.chat_data, chat_id)
+    game = CitiesGame(state, CITIES_SAMPLES)
     if not context.args:
         response = "Ваш ход."
     else:
         user_city = ' '.join(context.args)
-        bot_city, remaining_cities, notice = game.logic(user_city, context.user_data.get('bot_city_prev'))
-        context.user_data['bot_city_prev'] = bot_city
-        context.user_data['remaining_cities'] = remaining_cities
+        bot_city, _, notice = game.logic(user_city, context.chat_data.get('bot_city_prev'))
+        if game.game_over:
+            new_cities_game(context.chat_data, context.chat_data['cities_dataset'], chat_id)
+            notice += " Начинаем новую игру, ваш ход."
+        elif bot_city is not None:
+            context.chat_data['bot_city_prev'] = bot_city
+            GAME_STORE.record(chat_id, 'user', cities.normalize_name(user_city))
+            GAME_STORE.record(chat_id, 'bot', bot_city)
         bot_city = prettify_name(bot_city)
         response = notice if notice is not None else f"{bot_city}, Ваш ход."
-    update.message.reply_text(response)
-
-
-def first_priority_ops(parts):
-    if isinstance(parts, list):
-        for i in range(len(parts)):
-            parts[i] = first_priority_ops(parts[i])
-        return parts[0] - sum(parts[1:])
-    elif isinstance(parts, str):
-        if '*' in parts:
-            result, *multipliers = map(first_priority_ops, parts.split('*'))
-            for multiplier in multipliers:
-                result *= multiplier
-            return result
-        elif '/' in parts:
-            result, *divisors = map(first_priority_ops, parts.split('/'))
-            for divisor in divisors:
-                result /= divisor
-            return result
-        else:
-            return float(parts)
-    return parts
+    reply(update, response)
 
 
-def last_priority_ops(expr):
-    parts = expr.replace(' ', '').split('+')
-    return sum([first_priority_ops(part.split('-')) for part in parts])
+def calc_batch(update, context, lines, as_file=False):
+    mode, precision = context.chat_data.get('calc_mode', ('float', 28))
+    try:
+        results = '\n'.join(CALC_POOL.run_batch(lines, mode, precision))
+    except calc_engine.CalcError as e:
+        reply(update, str(e))
+        return
+    if as_file or len(results) > MAX_MESSAGE_LENGTH:
+        reply_document(update, results.encode(), "results.txt")
+    else:
+        reply(update, results or "No expressions found.")
 
 
 def calc(update, context):
     if not context.args:
         return
+    lines = update.message.text.split(maxsplit=1)[1].splitlines()
+    if len(lines) > 1:
+        calc_batch(update, context, lines)
+        return
     expr = ''.join(context.args)
+    mode, precision = context.chat_data.get('calc_mode', ('float', 28))
     try:
-        result = last_priority_ops(expr)
-    except ZeroDivisionError:
-        result = "You can't divide by zero."
+        result = calc_engine.format_result(CALC_POOL.calculate(expr, mode, precision))
+    except calc_engine.CalcError as e:
+        result = f"{e} Try again."
+    except ArithmeticError as e:
+        result = calc_engine.error_message(e)
+    reply(update, result)
+
+
+def calc_file(update, context):
+    document = update.message.document
+    if document.file_size and document.file_size > CALC_FILE_LIMIT:
+        reply(update, f"The file is too large. Send at most {CALC_FILE_LIMIT // 1024} KB.")
+        return
+    data = context.bot.get_file(document.file_id).download_as_bytearray()
+    calc_batch(update, context, data.decode('utf-8', errors='replace').splitlines(), as_file=True)
+
+
+def calc_mode(update, context):
+    usage = "Usage: /calc_mode float | exact | decimal [precision]"
+    if not context.args:
+        mode, precision = context.chat_data.get('calc_mode', ('float', 28))
+        reply(update, f"Calculator mode: {mode}" + (f", precision {precision}." if mode == 'decimal' else ".") +
+              f"\n{usage}")
+        return
+    mode, *precision = context.args
+    try:
+        precision = int(precision[0]) if precision else 28
     except ValueError:
-        result = "Invalid operands you entered. Try again."
-    update.message.reply_text(result)
+        precision = 0
+    if mode not in calc_engine.MODES or not 1 <= precision <= calc_engine.MAX_PRECISION:
+        reply(update, usage)
+        return
+    context.chat_data['calc_mode'] = mode, precision
+    reply(update, f"Calculator mode: {mode}.")
 
 
-def main():
-    bot = Updater(API_KEY)
+def profile(update, context):
+    if update.effective_user.id not in ADMIN_IDS:
+        reply(update, "This command is for admins only.")
+        return
+    usage = f"Usage: /profile <seconds, 1-{PROFILE_MAX_SECONDS}>"
+    try:
+        seconds = float(context.args[0]) if context.args else 10
+    except ValueError:
+        seconds = 0
+    if not 1 <= seconds <= PROFILE_MAX_SECONDS:
+        reply(update, usage)
+        return
+    if not PROFILE_LOCK.acquire(blocking=False):
+        reply(update, "A profile is already running.")
+        return
+    try:
+        reply(update, f"Profiling for {seconds:g} s.")
+        sampler = profiler.SamplingProfiler().run(seconds)
+    finally:
+        PROFILE_LOCK.release()
+    reply_document(update, sampler.collapsed().encode(), f"profile_{dt.now():%Y%m%d_%H%M%S}.folded")
+    reply(update, f"{sampler.samples} samples, {len(sampler.stacks)} distinct stacks. "
+                  f"Open the file with flamegraph.pl or speedscope.")
+
+
+COMMANDS = {
+    "start": greet_user,
+    "planet": get_constelation,
+    "next_full_moon": get_next_full_moon,
+    "ephemeris": get_ephemeris,
+    "moon": get_moon,
+    "moon_calendar": get_moon_calendar,
+    "wordcount": wordcount,
+    "textstats": textstats,
+    "cities": cities_game,
+    "cities_mode": cities_mode,
+    "calc": calc,
+    "calc_mode": calc_mode,
+    "stats_on": stats_on,
+    "stats_off": stats_off,
+    "top": top,
+    "profile": profile,
+}
+BLOCKING_COMMANDS = {"calc", "ephemeris", "profile"}
+
+
+def setup_logging():
+    return bot_logging.setup_logging(getattr(settings, 'LOG_FILE', "bot.log"),
+                                     json_format=getattr(settings, 'LOG_JSON', False),
+                                     max_bytes=getattr(settings, 'LOG_MAX_BYTES', 10 << 20),
+                                     backups=getattr(settings, 'LOG_BACKUPS', 5),
+                                     when=getattr(settings, 'LOG_ROTATE_WHEN', None))
+
+
+def open_resources():
+    global GAME_STORE, CHAT_STATS
+    if GAME_STORE is None:
+        threading.Thread(target=lambda: MOON_PHASES.phases, name="moon-phases", daemon=True).start()
+        GAME_STORE = game_store.open_store(getattr(settings, 'GAME_STORE', 'sqlite:///games.sqlite3'))
+        CHAT_STATS = chat_stats.ChatStats(getattr(settings, 'CHAT_STATS_PATH', 'chat_stats.sqlite3'),
+                                          CHAT_STATS_FLUSH)
+
+
+def close_resources():
+    global GAME_STORE, CHAT_STATS
+    CALC_POOL.close()
+    if GAME_STORE is not None:
+        GAME_STORE.close()
+        CHAT_STATS.close()
+        GAME_STORE = CHAT_STATS = None
+
+
+def instrument(command, callback):
+    return METRICS.wrap(command, bot_logging.logged(command, callback))
+
+
+def setup_dispatcher(dp):
+    open_resources()
+    for command, callback in COMMANDS.items():
+        run_async = command in BLOCKING_COMMANDS and dp.workers > 0
+        dp.add_handler(CommandHandler(command, instrument(command, callback), run_async=run_async))
+
+    dp.add_handler(MessageHandler(Filters.document & Filters.caption_regex(r'^/calc\b'),
+                                  instrument("calc_file", calc_file), run_async=dp.workers > 0))
+    dp.add_handler(MessageHandler(Filters.document & Filters.caption_regex(r'^/textstats\b'),
+                                  instrument("textstats_file", textstats_file), run_async=dp.workers > 0))
+    dp.add_handler(MessageHandler(Filters.text, METRICS.wrap("text", talk_to_me)))
+
+
+def dump_metrics(context=None):
+    METRICS.dump(METRICS_DUMP)
 
-    dp = bot.dispatcher
-    dp.add_handler(CommandHandler("start", greet_user))
-    dp.add_handler(CommandHandler("planet", get_constelation))
-    dp.add_handler(CommandHandler("next_full_moon", get_next_full_moon))
-    dp.add_handler((CommandHandler("wordcount", wordcount)))
-    dp.add_handler((CommandHandler("cities", cities_game)))
-    dp.add_handler(CommandHandler("calc", calc))
 
-    dp.add_handler(MessageHandler(Filters.text, talk_to_me))
+def main():
+    setup_logging()
+    bot = Updater(API_KEY)
+    setup_dispatcher(bot.dispatcher)
+    outbox = Outbox(bot.bot.send_message, bot.bot.send_document)
+    replies.set_outbox(outbox)
+    SKY.schedule(bot.job_queue)
+    if METRICS_ADDRESS:
+        METRICS.serve(*METRICS_ADDRESS)
+    if METRICS_DUMP:
+        bot.job_queue.run_repeating(dump_metrics, METRICS_DUMP_INTERVAL, first=METRICS_DUMP_INTERVAL)
 
     bot.start_polling()
     bot.idle()
+    outbox.close()
+    logging.info("Outbox: %s", outbox.stats())
+    close_resources()
+    if METRICS_DUMP:
+        dump_metrics()
 
 
 if __name__ == "__main__":
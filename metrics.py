@@ -0,0 +1,111 @@
+import os
+import threading
+import time
+
+from bisect import bisect_left
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SUM, ERRORS, IN_FLIGHT = -3, -2, -1
+
+
+class Metrics:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+            return shard
+
+    def wrap(self, name, callback):
+        size = len(self.buckets) + 4
+
+        @wraps(callback)
+        def wrapper(update, context):
+            shard = self._shard()
+            stats = shard.get(name)
+            if stats is None:
+                stats = shard[name] = [0] * size
+            stats[IN_FLIGHT] += 1
+            start = time.perf_counter()
+            try:
+                return callback(update, context)
+            except Exception:
+                stats[ERRORS] += 1
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                stats[bisect_left(self.buckets, elapsed)] += 1
+                stats[SUM] += elapsed
+                stats[IN_FLIGHT] -= 1
+        return wrapper
+
+    def snapshot(self):
+        with self._shards_lock:
+            shards = list(self._shards)
+        totals = {}
+        for shard in shards:
+            for name, stats in list(shard.items()):
+                total = totals.setdefault(name, [0] * len(stats))
+                for i, value in enumerate(stats):
+                    total[i] += value
+        return totals
+
+    def render(self):
+        totals = self.snapshot()
+        lines = ["# HELP bot_handler_latency_seconds Time spent in a handler.",
+                 "# TYPE bot_handler_latency_seconds histogram"]
+        for name, stats in sorted(totals.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), stats):
+                cumulative += count
+                lines.append(f'bot_handler_latency_seconds_bucket{{command="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'bot_handler_latency_seconds_sum{{command="{name}"}} {stats[SUM]:.6f}')
+            lines.append(f'bot_handler_latency_seconds_count{{command="{name}"}} {cumulative}')
+        lines += ["# HELP bot_handler_errors_total Handler calls that raised an exception.",
+                  "# TYPE bot_handler_errors_total counter"]
+        lines += [f'bot_handler_errors_total{{command="{name}"}} {stats[ERRORS]}'
+                  for name, stats in sorted(totals.items())]
+        lines += ["# HELP bot_handler_in_flight Handler calls that are running right now.",
+                  "# TYPE bot_handler_in_flight gauge"]
+        lines += [f'bot_handler_in_flight{{command="{name}"}} {stats[IN_FLIGHT]}'
+                  for name, stats in sorted(totals.items())]
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path):
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w') as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+    def serve(self, host='127.0.0.1', port=9108):
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+        return server
@@ -0,0 +1,183 @@
+import heapq
+import io
+import logging
+import threading
+import time
+
+MAX_MESSAGE_LENGTH = 4096
+TEXT, CHUNK, DOCUMENT = 'text', 'chunk', 'document'
+PRUNE_THRESHOLD = 1024
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now=None):
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        return 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def full(self, now=None):
+        self._refill(time.monotonic() if now is None else now)
+        return self.tokens >= self.capacity
+
+    def take(self, now=None):
+        self._refill(time.monotonic() if now is None else now)
+        self.tokens -= 1
+
+
+def coalesce(texts):
+    chunk = ''
+    for text in texts:
+        text = str(text)
+        if chunk and len(chunk) + 1 + len(text) > MAX_MESSAGE_LENGTH:
+            yield chunk
+            chunk = ''
+        chunk = f"{chunk}\n{text}" if chunk else text
+        while len(chunk) > MAX_MESSAGE_LENGTH:
+            yield chunk[:MAX_MESSAGE_LENGTH]
+            chunk = chunk[MAX_MESSAGE_LENGTH:]
+    if chunk:
+        yield chunk
+
+
+class Outbox:
+    def __init__(self, send, send_document=None, global_rate=30, chat_rate=1, chat_burst=3):
+        self.send = send
+        self.send_document = send_document
+        self.global_bucket = TokenBucket(global_rate, max(global_rate, 1))
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.sent = 0
+        self.failed = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self._buckets = {}
+        self._prune_at = PRUNE_THRESHOLD
+        self._pending = {}
+        self._ready = []
+        self._depth = 0
+        self._stopped = False
+        self._cond = threading.Condition()
+        self._worker = threading.Thread(target=self._run, name="outbox", daemon=True)
+        self._worker.start()
+
+    def _prune_buckets(self):
+        now = time.monotonic()
+        self._buckets = {chat_id: bucket for chat_id, bucket in self._buckets.items()
+                         if chat_id in self._pending or not bucket.full(now)}
+        self._prune_at = max(PRUNE_THRESHOLD, 2 * len(self._buckets))
+
+    def _queue(self, chat_id, items, first=False):
+        if chat_id not in self._pending:
+            if len(self._buckets) >= self._prune_at:
+                self._prune_buckets()
+            self._pending[chat_id] = []
+            bucket = self._buckets.setdefault(chat_id, TokenBucket(self.chat_rate, self.chat_burst))
+            heapq.heappush(self._ready, (time.monotonic() + (0 if first else bucket.delay()), chat_id))
+        if first:
+            self._pending[chat_id][:0] = items
+        else:
+            self._pending[chat_id] += items
+        self._depth += len(items)
+        self._cond.notify()
+
+    def put(self, chat_id, text):
+        with self._cond:
+            self._queue(chat_id, [(time.monotonic(), TEXT, text)])
+
+    def put_document(self, chat_id, data, filename):
+        with self._cond:
+            self._queue(chat_id, [(time.monotonic(), DOCUMENT, (data, filename))])
+
+    def stats(self):
+        with self._cond:
+            return {
+                'queue_depth': self._depth,
+                'chats_waiting': len(self._pending),
+                'sent': self.sent,
+                'failed': self.failed,
+                'avg_latency': self.total_latency / self.sent if self.sent else 0.0,
+                'max_latency': self.max_latency,
+            }
+
+    def _next_batch(self):
+        with self._cond:
+            while True:
+                if self._stopped and not self._ready:
+                    return None, None
+                now = time.monotonic()
+                wait = self._ready[0][0] - now if self._ready else None
+                if wait is not None and wait <= 0:
+                    wait = self.global_bucket.delay(now)
+                    if wait <= 0:
+                        self.global_bucket.take(now)
+                        _, chat_id = heapq.heappop(self._ready)
+                        self._buckets[chat_id].take(now)
+                        batch = self._pending.pop(chat_id)
+                        self._depth -= len(batch)
+                        return chat_id, batch
+                self._cond.wait(wait)
+
+    @staticmethod
+    def _messages(batch):
+        texts = []
+        for queued, kind, payload in batch:
+            if kind == TEXT:
+                if not texts:
+                    first = queued
+                texts.append(payload)
+                continue
+            if texts:
+                yield from ((first, CHUNK, chunk) for chunk in coalesce(texts))
+                texts = []
+            yield queued, kind, payload
+        if texts:
+            yield from ((first, CHUNK, chunk) for chunk in coalesce(texts))
+
+    def _deliver(self, chat_id, kind, payload):
+        if kind == DOCUMENT:
+            data, filename = payload
+            self.send_document(chat_id, document=io.BytesIO(data), filename=filename)
+        else:
+            self.send(chat_id, payload)
+
+    def _run(self):
+        while True:
+            chat_id, batch = self._next_batch()
+            if batch is None:
+                return
+            messages = list(self._messages(batch))
+            for i, (queued, kind, payload) in enumerate(messages):
+                try:
+                    self._deliver(chat_id, kind, payload)
+                except Exception as e:
+                    retry_after = getattr(e, 'retry_after', None)
+                    if retry_after is None:
+                        logging.exception("Failed to send a message to %s", chat_id)
+                        with self._cond:
+                            self.failed += 1
+                        continue
+                    with self._cond:
+                        self._queue(chat_id, messages[i:], first=True)
+                    time.sleep(retry_after)
+                    break
+                latency = time.monotonic() - queued
+                with self._cond:
+                    self.sent += 1
+                    self.total_latency += latency
+                    self.max_latency = max(self.max_latency, latency)
+
+    def close(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._worker.join()
@@ -0,0 +1,46 @@
+import os
+import sys
+import threading
+import time
+
+from collections import Counter
+
+
+def frame_name(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = 0
+        self.stacks = Counter()
+        self._names = {}
+
+    def sample(self):
+        me = threading.get_ident()
+        threads = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                name = self._names.get(code)
+                if name is None:
+                    name = self._names[code] = frame_name(code)
+                stack.append(name)
+                frame = frame.f_back
+            stack.append(threads.get(ident, f"thread-{ident}"))
+            self.stacks[';'.join(reversed(stack))] += 1
+        self.samples += 1
+
+    def run(self, seconds):
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            self.sample()
+            time.sleep(self.interval)
+        return self
+
+    def collapsed(self):
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
@@ -0,0 +1,55 @@
+import io
+import threading
+
+from contextlib import contextmanager
+
+_local = threading.local()
+_outbox = None
+
+
+def set_outbox(outbox):
+    global _outbox
+    _outbox = outbox
+
+
+@contextmanager
+def inline_reply():
+    _local.slot = slot = []
+    try:
+        yield slot
+    finally:
+        _local.slot = None
+
+
+def reply(update, text):
+    slot = getattr(_local, 'slot', None)
+    if slot is not None:
+        slot.append((update, str(text), None))
+    elif _outbox is not None:
+        _outbox.put(update.effective_chat.id, text)
+    else:
+        update.message.reply_text(text)
+
+
+def reply_document(update, data, filename):
+    slot = getattr(_local, 'slot', None)
+    if slot is not None:
+        slot.append((update, data, filename))
+    elif _outbox is not None:
+        _outbox.put_document(update.effective_chat.id, data, filename)
+    else:
+        update.message.reply_document(document=io.BytesIO(data), filename=filename)
+
+
+def inline_payload(slot):
+    if len(slot) == 1 and slot[0][2] is None:
+        update, text, _ = slot[0]
+        return {'method': 'sendMessage', 'chat_id': update.effective_chat.id, 'text': text}
+
+
+def send_pending(slot):
+    for update, data, filename in slot:
+        if filename is None:
+            reply(update, data)
+        else:
+            reply_document(update, data, filename)
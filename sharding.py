@@ -0,0 +1,133 @@
+import argparse
+import logging
+import multiprocessing
+import time
+
+import bot_logging
+import settings
+
+from outbox import Outbox
+from telegram import Bot, Update, User
+from telegram.error import NetworkError, RetryAfter
+from telegram.ext import Dispatcher
+
+
+class DryRunBot(Bot):
+    def __init__(self, token):
+        super().__init__(token)
+        self.bot = User(0, "Dry run", is_bot=True, username="dry_run_bot")
+        self._commands = []
+
+    def send_message(self, chat_id, text, *args, **kwargs):
+        logging.info("Reply to %s: %s", chat_id, text)
+
+
+def chat_id_of(data):
+    for value in data.values():
+        if isinstance(value, dict):
+            chat = value.get('chat') or value.get('message', {}).get('chat')
+            if chat:
+                return chat['id']
+    return 0
+
+
+def telegram_updates(token, poll_timeout=10, max_backoff=30):
+    bot = Bot(token)
+    offset = None
+    backoff = 1
+    while True:
+        try:
+            updates = bot.get_updates(offset, timeout=poll_timeout)
+        except RetryAfter as e:
+            time.sleep(e.retry_after)
+            continue
+        except NetworkError as e:
+            logging.warning("getUpdates failed (%s), retrying in %d s", e, backoff)
+            time.sleep(backoff)
+            backoff = min(backoff * 2, max_backoff)
+            continue
+        backoff = 1
+        for update in updates:
+            offset = update.update_id + 1
+            yield update.to_dict()
+
+
+def fake_update(update_id, chat_id, text):
+    command_length = len(text.split()[0]) if text.startswith('/') else 0
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': {'id': chat_id, 'is_bot': False, 'first_name': f"user{chat_id}"},
+            'text': text,
+            'entities': [{'type': 'bot_command', 'offset': 0, 'length': command_length}]
+            if command_length else [],
+        },
+    }
+
+
+def fake_updates(chats, commands):
+    update_id = 0
+    for text in commands:
+        for chat_id in range(1, chats + 1):
+            update_id += 1
+            yield fake_update(update_id, chat_id, text)
+
+
+def worker(updates, records, bot_class, token, global_rate):
+    import lpmegabot
+    import replies
+
+    if records is not None:
+        bot_logging.log_to_parent(records)
+    bot = bot_class(token)
+    dp = Dispatcher(bot, None, workers=0)
+    lpmegabot.setup_dispatcher(dp)
+    outbox = Outbox(bot.send_message, bot.send_document, global_rate=global_rate)
+    replies.set_outbox(outbox)
+    for data in iter(updates.get, None):
+        dp.process_update(Update.de_json(data, bot))
+    outbox.close()
+    lpmegabot.close_resources()
+
+
+def run(source, n_workers, bot_class=Bot, token=settings.API_KEY, records=None, global_rate=30):
+    ctx = multiprocessing.get_context('spawn')
+    queues = [ctx.Queue() for _ in range(n_workers)]
+    workers = [ctx.Process(target=worker, args=(q, records, bot_class, token, global_rate / n_workers),
+                           name=f"worker-{i}")
+               for i, q in enumerate(queues)]
+    for process in workers:
+        process.start()
+    try:
+        for data in source:
+            queues[chat_id_of(data) % n_workers].put(data)
+    finally:
+        for q in queues:
+            q.put(None)
+        for process in workers:
+            process.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the bot as N worker processes sharded by chat id.")
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--fake-chats', type=int, help="replay synthetic updates for this many chats")
+    args = parser.parse_args()
+
+    import lpmegabot
+
+    records = multiprocessing.get_context('spawn').Queue()
+    bot_logging.listen_to_processes(records, lpmegabot.setup_logging())
+    lpmegabot.MOON_PHASES.phases
+    if args.fake_chats:
+        commands = ["/start", "/calc 2+2*2", "/wordcount Привет как дела", "/cities Москва", "/planet Mars"]
+        run(fake_updates(args.fake_chats, commands), args.workers, DryRunBot, "123456:dry-run", records)
+    else:
+        run(telegram_updates(settings.API_KEY), args.workers, records=records)
+
+
+if __name__ == '__main__':
+    main()
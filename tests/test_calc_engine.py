@@ -0,0 +1,145 @@
+import re
+
+from decimal import Decimal
+from fractions import Fraction
+
+import pytest
+
+import calc_engine
+
+from calc_engine import CalcError, calculate
+
+
+@pytest.mark.parametrize('expr, expected', [
+    ('2+2*2', 6),
+    ('(2+2)*2', 8),
+    ('10-4-3', 3),
+    ('64/4/2', 8),
+    ('2^3^2', 512),
+    ('2**3**2', 512),
+    ('2*3^2', 18),
+    ('1.5e2 + .5', 150.5),
+])
+def test_precedence_and_associativity(expr, expected):
+    assert calculate(expr) == expected
+
+
+@pytest.mark.parametrize('expr, expected', [
+    ('-2', -2),
+    ('+2', 2),
+    ('--2', 2),
+    ('-2^2', -4),
+    ('2^-1', 0.5),
+    ('3*-2', -6),
+    ('-(1+2)*3', -9),
+])
+def test_unary_operators(expr, expected):
+    assert calculate(expr) == expected
+
+
+def test_whitespace_separates_tokens():
+    assert calculate(' 2 ^ 3 *\t2 ') == 16
+    assert calculate('x2 + x', variables={'x2': 1, 'x': 2}) == 3
+    assert calculate('1.50 + 1', 'decimal') == Decimal('2.50')
+    assert calculate('1.5 + 1', 'decimal') == Decimal('2.5')
+    assert str(calculate('1.5 + 1', 'decimal')) == '2.5'
+
+
+def test_exact_and_decimal_modes():
+    assert calculate('1/3 + 1/6', 'exact') == Fraction(1, 2)
+    assert calculate('2^10 / 4', 'exact') == 256
+    assert calculate('1/3', 'decimal', precision=5) == Decimal('0.33333')
+
+
+@pytest.mark.parametrize('expr, expected', [
+    ('10*100', '1000'),
+    ('500+500', '1000'),
+    ('2.5*4', '10'),
+    ('-10^30', '-1000000000000000000000000000000'),
+    ('1/4', '0.25'),
+])
+def test_decimal_results_are_positional(expr, expected):
+    assert calc_engine.format_result(calculate(expr, 'decimal')) == expected
+
+
+def test_variables():
+    assert calculate('x * 2 + y', variables={'x': 3, 'y': 1}) == 7
+
+
+@pytest.mark.parametrize('expr, message', [
+    ('', "Empty expression."),
+    ('(1+2', "Missing ')'."),
+    ('1+', "Missing operand."),
+    ('1+2)', "Unexpected ')'."),
+    ('*2', "Unexpected '*'."),
+    ('2 $ 3', "Unexpected symbol '$'."),
+    ('x + 1', "Unknown variable 'x'."),
+    ('2 3', "Unexpected '3'."),
+    ('x y', "Unexpected 'y'."),
+    ('1 000', "Unexpected '000'."),
+    ('2 (3)', "Unexpected '('."),
+])
+def test_errors(expr, message):
+    with pytest.raises(CalcError, match=re.escape(message)):
+        calculate(expr)
+
+
+def test_errors_are_value_errors():
+    with pytest.raises(ValueError):
+        calculate('1+')
+
+
+def test_length_limit():
+    calculate('+'.join(['1'] * (calc_engine.MAX_LENGTH // 2)))
+    with pytest.raises(CalcError, match="longer than"):
+        calculate('1' * (calc_engine.MAX_LENGTH + 1))
+
+
+def test_depth_limit():
+    depth = calc_engine.MAX_DEPTH - 1
+    assert calculate('(' * depth + '1' + ')' * depth) == 1
+    depth = calc_engine.MAX_DEPTH + 1
+    with pytest.raises(CalcError, match="nested too deeply"):
+        calculate('(' * depth + '1' + ')' * depth)
+
+
+@pytest.mark.parametrize('expr, mode', [
+    ('10^2000', 'float'),
+    ('10^2000', 'decimal'),
+    ('10^2000', 'exact'),
+    ('0.5^-5000', 'exact'),
+    ('(1/3)^5000', 'exact'),
+    ('1e5000', 'exact'),
+    ('9^999 * 9^999 * 9^999 * 9^999', 'exact'),
+])
+def test_size_limits(expr, mode):
+    with pytest.raises(CalcError, match="too large"):
+        calculate(expr, mode)
+
+
+def test_small_base_with_negative_exponent_is_allowed_when_the_result_fits():
+    assert calculate('0.5^-10', 'exact') == 1024
+    assert calculate('0^5') == 0
+
+
+@pytest.mark.parametrize('expr, mode', [
+    ('(-8)^(1/3)', 'float'),
+    ('(-8)^0.5', 'float'),
+])
+def test_complex_results_are_rejected(expr, mode):
+    with pytest.raises(CalcError, match="not a real number"):
+        calculate(expr, mode)
+
+
+def test_exact_mode_rejects_fractional_powers():
+    with pytest.raises(CalcError, match="Only integer powers"):
+        calculate('2^(1/2)', 'exact')
+
+
+def test_run_batch_reports_errors_per_line():
+    assert calc_engine.run_batch(['x = 2', '# comment', '', 'x^10', '1/0', 'y'], 'exact') == [
+        "x = 2",
+        "x^10 = 1024",
+        "1/0: You can't divide by zero.",
+        "y: Unknown variable 'y'.",
+    ]
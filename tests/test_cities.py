@@ -0,0 +1,111 @@
+import os
+
+import pytest
+
+import cities
+
+NAMES = ['анапа', 'астрахань', 'абакан', 'москва', 'мурманск', 'казань', 'курск', 'тула']
+
+
+@pytest.fixture
+def index(tmp_path):
+    path = tmp_path / 'test.idx'
+    cities.build_index(NAMES, str(path))
+    return cities.CityIndex(str(path))
+
+
+def remaining(state, letter):
+    start, _ = state.index.bucket(letter)
+    return sorted(state.index[state.slots.get(slot, slot)] for slot in range(start, start + state.count(letter)))
+
+
+def test_index_lookup(index):
+    assert len(index) == len(NAMES)
+    assert [index[city_id] for city_id in range(len(index))] == sorted(NAMES)
+    assert index[index.find('курск')] == 'курск'
+    assert index.find('орёл') is None
+    assert index.find('') is None
+
+
+def test_build_index_leaves_no_temporary_files(tmp_path):
+    path = tmp_path / 'test.idx'
+    cities.build_index(NAMES, str(path))
+    cities.build_index(NAMES[:3], str(path))
+    assert os.listdir(tmp_path) == ['test.idx']
+    assert len(cities.CityIndex(str(path))) == 3
+
+
+def test_fresh_state(index):
+    state = cities.GameState(index)
+    assert state.count('а') == 3
+    assert state.count('я') == 0
+    assert all(state.is_free(name) for name in NAMES)
+    assert not state.is_free('орёл')
+
+
+def test_use_swaps_the_city_out_of_its_bucket(index):
+    state = cities.GameState(index)
+    state.use('анапа')
+    assert state.count('а') == 2
+    assert not state.is_free('анапа')
+    assert state.is_free('астрахань') and state.is_free('абакан')
+    assert remaining(state, 'а') == ['абакан', 'астрахань']
+
+
+def test_use_every_city_of_a_letter_in_any_order(index):
+    state = cities.GameState(index)
+    for name in ['астрахань', 'анапа', 'абакан']:
+        state.use(name)
+        assert not state.is_free(name)
+    assert state.count('а') == 0
+    assert remaining(state, 'а') == []
+    assert state.pick('а') is None
+    assert state.count('м') == 2
+
+
+def test_pick_returns_each_city_once(index):
+    state = cities.GameState(index)
+    picked = [state.pick('а') for _ in range(3)]
+    assert sorted(picked) == ['абакан', 'анапа', 'астрахань']
+    assert state.pick('а') is None
+    assert not any(state.is_free(name) for name in picked)
+
+
+def test_pick_and_use_share_the_swap_state(index):
+    state = cities.GameState(index)
+    state.use('москва')
+    assert state.pick('м') == 'мурманск'
+    assert state.count('м') == 0
+    assert state.is_free('курск')
+
+
+def test_states_are_independent(index):
+    first, second = cities.GameState(index), cities.GameState(index)
+    first.use('тула')
+    assert not first.is_free('тула')
+    assert second.is_free('тула')
+    assert second.count('т') == 1
+
+
+def test_end_letters_skip_impossible_and_missing_letters(index):
+    assert index.end_letter(index.find('казань')) == 'а'
+    assert index.end_letter(index.find('абакан')) == 'а'
+    assert index.end_letter(index.find('курск')) == 'к'
+
+
+def test_end_counts_follow_used_cities(index):
+    state = cities.GameState(index)
+    assert state.end_count('к') == 2
+    assert state.end_count('м') == 0
+    state.use('анапа')
+    assert state.end_count('а') == index.end_counts['а'] - 1
+    state.use('мурманск')
+    assert state.end_count('к') == 1
+
+
+def test_pick_prefers_cities_that_leave_the_opponent_fewer_moves(index, monkeypatch):
+    state = cities.GameState(index)
+    _, count = index.bucket('к')
+    slots = iter(range(count))
+    monkeypatch.setattr(cities, 'randrange', lambda n: next(slots))
+    assert state.pick('к', samples=count) == 'курск'
@@ -0,0 +1,62 @@
+import os
+
+import ephem
+import pytest
+
+import ephem_cache
+
+from ephem_cache import MoonPhaseIndex
+
+
+@pytest.fixture(scope='module')
+def moon():
+    return MoonPhaseIndex(2020, 2021)
+
+
+@pytest.mark.parametrize('date', ['2020/1/1', '2020/6/15 12:00', '2021/12/31'])
+def test_next_matches_ephem(moon, date):
+    for phase, (_, next_phase) in enumerate(ephem_cache.PHASES):
+        assert moon.next(phase, date) == pytest.approx(next_phase(date), abs=1e-9)
+
+
+@pytest.mark.parametrize('date', ['2019/6/1', '2022/6/1'])
+def test_next_falls_back_to_ephem_outside_the_index(moon, date):
+    assert moon.next_full_moon(date) == pytest.approx(ephem.next_full_moon(date), abs=1e-9)
+
+
+def test_covers(moon):
+    assert moon.covers('2020/1/1')
+    assert moon.covers('2021/6/1')
+    assert not moon.covers('2019/12/31')
+    assert not moon.covers('2022/6/1')
+
+
+def test_current_and_between(moon):
+    full = ephem.next_full_moon('2021/3/1')
+    assert moon.current(ephem.Date(full + 1)) == 2
+    assert moon.current('2020/1/1') is None
+    expected = []
+    for name, next_phase in ephem_cache.PHASES:
+        date = next_phase('2021/3/1')
+        while date < ephem.Date('2021/4/1'):
+            expected.append((date, name))
+            date = next_phase(date)
+    phases = moon.between('2021/3/1', '2021/4/1')
+    assert [name for _, name in phases] == [name for _, name in sorted(expected)]
+    assert [date for date, _ in phases] == pytest.approx([date for date, _ in sorted(expected)], abs=1e-9)
+
+
+def test_saves_and_loads_the_index(tmp_path, monkeypatch):
+    path = str(tmp_path / 'moon.bin')
+    built = MoonPhaseIndex(2020, 2020, path=path).phases
+    assert os.listdir(tmp_path) == ['moon.bin']
+    monkeypatch.setattr(MoonPhaseIndex, 'build', lambda self: pytest.fail("the index was rebuilt"))
+    assert MoonPhaseIndex(2020, 2020, path=path).phases == built
+
+
+def test_rebuilds_an_index_for_other_years(tmp_path):
+    path = str(tmp_path / 'moon.bin')
+    MoonPhaseIndex(2020, 2020, path=path).phases
+    assert MoonPhaseIndex(2021, 2021, path=path).covers('2021/6/1')
+    assert MoonPhaseIndex(2021, 2021, path=path)._load()[2][0] > ephem.Date('2021/1/1')
+    assert os.listdir(tmp_path) == ['moon.bin']
@@ -0,0 +1,63 @@
+import pytest
+
+import game_store
+
+from game_store import NEW_GAME, GameStore, MemoryBackend, SqliteBackend
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def backend(request, tmp_path):
+    backend = MemoryBackend() if request.param == 'memory' else SqliteBackend(str(tmp_path / 'games.sqlite3'))
+    yield backend
+    backend.close()
+
+
+def test_events_are_loaded_in_order(backend):
+    backend.append([(1, NEW_GAME, 'ru'), (1, 'user', 'москва'), (2, NEW_GAME, 'ru'), (1, 'bot', 'анапа')])
+    assert [tuple(event) for event in backend.load(1)] == [(NEW_GAME, 'ru'), ('user', 'москва'), ('bot', 'анапа')]
+    assert [tuple(event) for event in backend.load(2)] == [(NEW_GAME, 'ru')]
+    assert list(backend.load(3)) == []
+
+
+def test_new_game_truncates_only_its_chat(backend):
+    backend.append([(1, NEW_GAME, 'ru'), (1, 'user', 'москва'), (2, NEW_GAME, 'ru'), (2, 'user', 'тула')])
+    backend.append([(1, NEW_GAME, 'world'), (1, 'user', 'рим')])
+    assert [tuple(event) for event in backend.load(1)] == [(NEW_GAME, 'world'), ('user', 'рим')]
+    assert [tuple(event) for event in backend.load(2)] == [(NEW_GAME, 'ru'), ('user', 'тула')]
+
+
+def test_store_writes_batches_and_flushes_on_close(tmp_path):
+    path = str(tmp_path / 'games.sqlite3')
+    store = GameStore(SqliteBackend(path), batch_size=2, flush_interval=60)
+    store.record(1, NEW_GAME, 'ru')
+    for city in ['москва', 'анапа', 'астрахань']:
+        store.record(1, 'user', city)
+    store.close()
+    backend = SqliteBackend(path)
+    assert [value for _, value in backend.load(1)] == ['ru', 'москва', 'анапа', 'астрахань']
+    backend.close()
+
+
+def test_open_store():
+    game_store.open_store('memory://').close()
+    with pytest.raises(ValueError):
+        game_store.open_store('redis://localhost')
+
+
+def test_restore_replays_the_stored_game(monkeypatch):
+    lpmegabot = pytest.importorskip('lpmegabot')
+    store = game_store.open_store('memory://')
+    monkeypatch.setattr(lpmegabot, 'GAME_STORE', store)
+    chat_data = {}
+    state = lpmegabot.new_cities_game(chat_data, lpmegabot.CITIES_DATASET, 1)
+    for kind, city in [('user', 'москва'), ('bot', 'анапа')]:
+        state.use(city)
+        store.record(1, kind, city)
+    store.close()
+
+    restored = {}
+    state = lpmegabot.restore_cities_game(restored, 1)
+    assert not state.is_free('москва') and not state.is_free('анапа')
+    assert state.is_free('астрахань')
+    assert restored['bot_city_prev'] == 'анапа'
+    assert restored['cities_dataset'] == lpmegabot.CITIES_DATASET
@@ -0,0 +1,104 @@
+import time
+
+from telegram.error import RetryAfter
+
+import outbox
+
+from outbox import MAX_MESSAGE_LENGTH, Outbox, TokenBucket, coalesce
+
+
+class Recorder:
+    def __init__(self, errors=None):
+        self.sent = []
+        self.errors = errors or {}
+        self.calls = 0
+
+    def send(self, chat_id, text):
+        self.calls += 1
+        if self.calls in self.errors:
+            raise self.errors[self.calls]
+        self.sent.append((chat_id, text))
+
+    def send_document(self, chat_id, document, filename):
+        self.calls += 1
+        self.sent.append((chat_id, filename, document.read()))
+
+
+def deliver(recorder, items, **kwargs):
+    box = Outbox(recorder.send, recorder.send_document, **kwargs)
+    with box._cond:
+        for chat_id, item in items:
+            if isinstance(item, tuple):
+                box.put_document(chat_id, *item)
+            else:
+                box.put(chat_id, item)
+    box.close()
+    return box
+
+
+def test_coalesce_joins_and_splits():
+    assert list(coalesce(['a', 'b', 3])) == ['a\nb\n3']
+    chunks = list(coalesce(['x' * 3000, 'y' * 3000]))
+    assert chunks == ['x' * 3000, 'y' * 3000]
+    chunks = list(coalesce(['z' * (MAX_MESSAGE_LENGTH * 2 + 1)]))
+    assert [len(chunk) for chunk in chunks] == [MAX_MESSAGE_LENGTH, MAX_MESSAGE_LENGTH, 1]
+
+
+def test_replies_to_one_chat_are_coalesced():
+    recorder = Recorder()
+    box = deliver(recorder, [(1, 'one'), (2, 'other'), (1, 'two')])
+    assert sorted(recorder.sent) == [(1, 'one\ntwo'), (2, 'other')]
+    assert box.stats()['sent'] == 2
+    assert box.stats()['queue_depth'] == 0
+
+
+def test_documents_keep_their_place_between_texts():
+    recorder = Recorder()
+    deliver(recorder, [(1, 'before'), (1, (b'data', 'file.txt')), (1, 'after')])
+    assert recorder.sent == [(1, 'before'), (1, 'file.txt', b'data'), (1, 'after')]
+
+
+def test_retry_after_requeues_only_unsent_chunks():
+    recorder = Recorder({2: RetryAfter(0.01)})
+    texts = ['a' * 3000, 'b' * 3000, 'c' * 3000]
+    box = deliver(recorder, [(1, text) for text in texts])
+    assert [text for _, text in recorder.sent] == texts
+    assert recorder.calls == 4
+    assert box.stats()['failed'] == 0
+
+
+def test_other_errors_are_counted_and_skipped():
+    recorder = Recorder({1: RuntimeError("boom")})
+    box = deliver(recorder, [(1, 'bad'), (1, (b'', 'file.txt')), (1, 'good')])
+    assert recorder.sent == [(1, 'file.txt', b''), (1, 'good')]
+    assert box.stats()['failed'] == 1
+
+
+def test_idle_chat_buckets_are_pruned(monkeypatch):
+    monkeypatch.setattr(outbox, 'PRUNE_THRESHOLD', 4)
+    recorder = Recorder()
+    box = Outbox(recorder.send, chat_rate=1000)
+    for chat_id in range(50):
+        box.put(chat_id, 'hi')
+        while len(recorder.sent) <= chat_id:
+            time.sleep(0.001)
+        time.sleep(0.005)
+    box.close()
+    assert len(recorder.sent) == 50
+    assert len(box._buckets) < 8
+
+
+def test_fractional_global_rate_still_sends():
+    recorder = Recorder()
+    deliver(recorder, [(1, 'slow')], global_rate=0.5)
+    assert recorder.sent == [(1, 'slow')]
+
+
+def test_token_bucket():
+    bucket = TokenBucket(10, 2)
+    now = bucket.updated
+    bucket.take(now)
+    bucket.take(now)
+    assert bucket.delay(now) == 0.1
+    assert not bucket.full(now)
+    assert bucket.full(now + 0.5)
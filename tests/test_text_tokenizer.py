@@ -0,0 +1,50 @@
+import io
+
+import pytest
+
+import text_tokenizer
+
+from text_tokenizer import TextStats
+
+TEXT = "Привет, мир! Hello world... Это\tтест —\r\nтест-драйв; don't stop. Ещё раз?"
+
+
+def streamed(data, chunk_size):
+    stats = TextStats()
+    stats.feed_stream(io.BytesIO(data), chunk_size)
+    return stats.finish()
+
+
+def test_count_words():
+    assert text_tokenizer.count_words(TEXT) == 11
+    assert list(text_tokenizer.tokenize("don't stop-it", hyphenated=False)) == ["don't", 'stop', 'it']
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 64, 1 << 16])
+def test_chunk_boundaries_do_not_change_the_counts(chunk_size):
+    whole = TextStats()
+    whole.feed(TEXT)
+    whole.finish()
+    stats = streamed(TEXT.encode() * 3, chunk_size)
+    assert stats.words == whole.words * 3
+    assert stats.sentences == whole.sentences * 3
+    assert stats.frequencies == {word: n * 3 for word, n in whole.frequencies.items()}
+
+
+def test_tail_is_bounded_after_a_leading_space(monkeypatch):
+    monkeypatch.setattr(text_tokenizer, 'MAX_TAIL', 100)
+    stats = TextStats()
+    tails = []
+    stats.feed(' ')
+    for _ in range(50):
+        stats.feed('a' * 10)
+        tails.append(len(stats._tail))
+    assert max(tails) <= 100
+    assert stats.finish().words > 1
+
+
+def test_tail_is_cut_at_tabs_and_carriage_returns():
+    stats = TextStats()
+    stats.feed('one\ttwo\rthree')
+    assert stats._tail == '\rthree'
+    assert stats.words == 2
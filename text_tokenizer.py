@@ -0,0 +1,91 @@
+import codecs
+import re
+import string
+
+from collections import Counter
+from functools import lru_cache
+
+LETTERS = r"[^\W\d_]+"
+JOINERS = r"[-‐‑'’]"
+APOSTROPHES = r"['’]"
+NUMBER = r"\d+(?:[.,]\d+)*"
+EMOJI = r"[\U0001F000-\U0001FAFF☀-➿⬀-⯿](?:️|[\U0001F3FB-\U0001F3FF])*"
+
+
+@lru_cache(maxsize=None)
+def word_pattern(hyphenated=True, numbers=True, emoji=False):
+    word = rf"{LETTERS}(?:{JOINERS if hyphenated else APOSTROPHES}{LETTERS})*"
+    if numbers:
+        word = rf"(?:{word}|{NUMBER})(?:{JOINERS if hyphenated else APOSTROPHES}(?:{LETTERS}|{NUMBER}))*"
+    if emoji:
+        word = rf"{word}|{EMOJI}"
+    return re.compile(word)
+
+
+def tokenize(text, hyphenated=True, numbers=True, emoji=False):
+    return (match.group() for match in word_pattern(hyphenated, numbers, emoji).finditer(text))
+
+
+def count_words(text, hyphenated=True, numbers=True, emoji=False):
+    return sum(1 for _ in word_pattern(hyphenated, numbers, emoji).finditer(text))
+
+
+SENTENCE_END = r"[.!?…]+"
+MAX_TAIL = 1 << 16
+
+
+@lru_cache(maxsize=None)
+def stats_pattern(hyphenated=True, numbers=True, emoji=False):
+    return re.compile(rf"({word_pattern(hyphenated, numbers, emoji).pattern})|{SENTENCE_END}")
+
+
+class TextStats:
+    def __init__(self, hyphenated=True, numbers=True, emoji=False):
+        self.pattern = stats_pattern(hyphenated, numbers, emoji)
+        self.words = 0
+        self.sentences = 0
+        self.frequencies = Counter()
+        self._in_sentence = False
+        self._tail = ''
+
+    def _scan(self, text):
+        for match in self.pattern.finditer(text):
+            word = match.group(1)
+            if word is not None:
+                self.words += 1
+                self.frequencies[word.lower()] += 1
+                self._in_sentence = True
+            elif self._in_sentence:
+                self.sentences += 1
+                self._in_sentence = False
+
+    def feed(self, text):
+        text = self._tail + text
+        cut = max(map(text.rfind, string.whitespace))
+        if len(text) - cut > MAX_TAIL:
+            cut = len(text)
+        elif cut < 0:
+            self._tail = text
+            return
+        self._scan(text[:cut])
+        self._tail = text[cut:]
+
+    def feed_stream(self, stream, chunk_size=1 << 16):
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        for chunk in iter(lambda: stream.read(chunk_size), b''):
+            self.feed(decoder.decode(chunk))
+        self.feed(decoder.decode(b'', final=True))
+
+    def finish(self):
+        self._scan(self._tail)
+        self._tail = ''
+        if self._in_sentence:
+            self.sentences += 1
+            self._in_sentence = False
+        return self
+
+    def summary(self, top=10):
+        lines = [f"Words: {self.words}", f"Unique words: {len(self.frequencies)}", f"Sentences: {self.sentences}"]
+        if self.frequencies:
+            lines.append("Top words: " + ", ".join(f"{word} ({n})" for word, n in self.frequencies.most_common(top)))
+        return '\n'.join(lines)
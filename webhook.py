@@ -0,0 +1,129 @@
+import argparse
+import asyncio
+import json
+import logging
+
+from concurrent.futures import ThreadPoolExecutor
+
+import lpmegabot
+import replies
+import settings
+
+from sharding import chat_id_of
+from telegram import Bot, Update
+from telegram.ext import Dispatcher
+
+MAX_BODY = 1 << 20
+STATUS = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large"}
+
+
+def process(dp, data):
+    update = Update.de_json(data, dp.bot)
+    with replies.inline_reply() as slot:
+        dp.process_update(update)
+    payload = replies.inline_payload(slot)
+    if payload is None:
+        replies.send_pending(slot)
+    return payload
+
+
+class WebhookServer:
+    def __init__(self, routes, shards=4, timeout=30):
+        self.routes = routes
+        self.timeout = timeout
+        self.executors = [ThreadPoolExecutor(1, thread_name_prefix=f"webhook-{i}") for i in range(shards)]
+
+    async def handle_update(self, path, body):
+        dp = self.routes.get(path)
+        if dp is None:
+            return 404, None
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return 400, None
+        if not isinstance(data, dict):
+            return 400, None
+        try:
+            executor = self.executors[chat_id_of(data) % len(self.executors)]
+            payload = await asyncio.get_running_loop().run_in_executor(executor, process, dp, data)
+        except (AttributeError, KeyError, TypeError):
+            logging.warning("Rejected a malformed update", exc_info=True)
+            return 400, None
+        return 200, payload
+
+    async def _read(self, read):
+        return await asyncio.wait_for(read, self.timeout)
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await self._read(reader.readline())
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await self._read(reader.readline())
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY:
+                    status, payload = 413, None
+                elif method != 'POST':
+                    status, payload = 404, None
+                else:
+                    status, payload = await self.handle_update(path, await self._read(reader.readexactly(length)))
+
+                body = json.dumps(payload).encode() if payload else b''
+                keep_alive = headers.get('connection', '').lower() != 'close' and status != 413
+                writer.write(f"HTTP/1.1 {status} {STATUS[status]}\r\n"
+                             f"Content-Type: application/json\r\n"
+                             f"Content-Length: {len(body)}\r\n"
+                             f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+def make_route(token, url=None):
+    bot = Bot(token)
+    dp = Dispatcher(bot, None, workers=0)
+    lpmegabot.setup_dispatcher(dp)
+    path = f"/{token}"
+    if url:
+        bot.set_webhook(url.rstrip('/') + path)
+    return path, dp
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the bot through a Telegram webhook.")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8443)
+    parser.add_argument('--url', help="public base URL to register with Telegram")
+    parser.add_argument('--token', action='append', help="bot token, may be repeated")
+    parser.add_argument('--shards', type=int, default=4, help="handler threads, chats are split between them")
+    args = parser.parse_args()
+
+    lpmegabot.setup_logging()
+    routes = dict(make_route(token, args.url) for token in args.token or [settings.API_KEY])
+    logging.info("Webhook listening on %s:%d for %d bot(s)", args.host, args.port, len(routes))
+    try:
+        asyncio.run(WebhookServer(routes, args.shards).serve(args.host, args.port))
+    finally:
+        lpmegabot.close_resources()
+
+
+if __name__ == '__main__':
+    main()